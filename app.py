@@ -1,11 +1,25 @@
 import logging
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
 
 # Configure logging at module level
 logging.basicConfig(level=logging.INFO)
 import os
+import json
+import math
+import time
+import gzip
+import hashlib
+import threading
+from datetime import datetime
 import redis
-from rq import Queue
+from redis.exceptions import LockError
+from rq import Queue, Retry
+from place_cache import PlaceCache
+from dedup import DedupIndex
+from storage import job_file
+from progress import read_rows, events_channel
+from results import store_result, load_result, result_page, download_links
+from metrics import incr, render as render_metrics
 
 # App setup
 app = Flask(__name__)
@@ -15,6 +29,55 @@ redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
 conn = redis.from_url(redis_url)
 q = Queue(connection=conn)
 
+# How long a finished scrape can answer repeat searches for the same term, in seconds.
+QUERY_CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', 3600))
+JOB_TIMEOUT = 30 * 60
+# Seconds a request waits for another request starting the same search before answering 503.
+QUERY_LOCK_WAIT = 5
+# Failed jobs are retried this many times; each retry resumes from the term's checkpoint.
+JOB_RETRIES = int(os.getenv('JOB_RETRIES', 2))
+# Event streams are closed after this long; EventSource reconnects on its own with Last-Event-ID.
+SSE_MAX_SECONDS = int(os.getenv('SSE_MAX_SECONDS', 60))
+SSE_HEARTBEAT_SECONDS = 15
+# Every open stream holds one of the process's gthread threads (16 in the Procfile), so only
+# a few may run at once; further clients get 503 and the page falls back to polling.
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 4))
+sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+BATCH_MAX_TERMS = int(os.getenv('BATCH_MAX_TERMS', 500))
+BATCH_TERM_TIMEOUT = int(os.getenv('BATCH_TERM_TIMEOUT', 600))
+RESULT_PAGE_SIZE = 100
+RESULT_MAX_PAGE_SIZE = 1000
+
+def query_key(search_term):
+    """Redis key for a search term, ignoring case and extra whitespace."""
+    normalized = ' '.join(search_term.lower().split())
+    return 'query:' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+def find_reusable_job(key, max_age):
+    """Return (job, reason) for a running or fresh finished job for this query, or (None, None)."""
+    job_id = conn.get(key)
+    job = q.fetch_job(job_id.decode()) if job_id else None
+    if job is None:
+        return None, None
+    if job.get_status() in ('queued', 'started', 'deferred', 'scheduled'):
+        return job, 'coalesced'
+    # An empty result usually means the scrape was blocked, and a partial one (time limit or
+    # error) is better finished by a new job resuming from its checkpoint, so neither is reused.
+    if job.is_finished and job.ended_at and job.result and not job.meta.get('partial') and \
+            (datetime.utcnow() - job.ended_at).total_seconds() <= max_age:
+        return job, 'cached'
+    return None, None
+
+def parse_max_age(value):
+    """A request's max_age as seconds, or None if it isn't a finite, non-negative number."""
+    if isinstance(value, bool):
+        return None
+    try:
+        max_age = float(value)
+    except (TypeError, ValueError):
+        return None
+    return max_age if math.isfinite(max_age) and max_age >= 0 else None
+
 @app.route('/')
 def index():
     """Serve the frontend HTML."""
@@ -24,56 +87,246 @@ def index():
 @app.route('/start_scrape', methods=['POST'])
 def start_scrape():
     """Enqueue a scraping job."""
-    search_term = request.json.get('search_term')
+    data = request.json or {}
+    search_term = data.get('search_term')
     if not search_term:
         return jsonify({'error': 'Search term is required'}), 400
 
-    logging.info(f"Enqueuing scrape for: {search_term}")
+    max_age = parse_max_age(data.get('max_age', QUERY_CACHE_TTL))
+    if max_age is None:
+        return jsonify({'error': 'max_age must be a non-negative number of seconds'}), 400
+    key = query_key(search_term)
     try:
-        # Import the task function here to avoid circular imports
-        from worker import run_scrape_task
-        job = q.enqueue(run_scrape_task, search_term, job_timeout='30m')
+        # The lock stops two identical requests from both launching a browser.
+        lock = conn.lock(f'{key}:lock', timeout=10, blocking_timeout=QUERY_LOCK_WAIT)
+        if not lock.acquire():
+            response = jsonify({'error': 'An identical search is being started; try again shortly'})
+            response.headers['Retry-After'] = str(QUERY_LOCK_WAIT)
+            return response, 503
+        try:
+            job, reason = find_reusable_job(key, max_age)
+            if job:
+                logging.info(f"Reusing job {job.id} for: {search_term} ({reason})")
+                incr(conn, 'mapphone_query_reuse_total', {'reason': reason})
+                return jsonify({'job_id': job.id, reason: True})
+
+            logging.info(f"Enqueuing scrape for: {search_term}")
+            # Import the task function here to avoid circular imports
+            from worker import run_scrape_task
+            job = q.enqueue(run_scrape_task, search_term, job_timeout=JOB_TIMEOUT, result_ttl=QUERY_CACHE_TTL,
+                            retry=Retry(max=JOB_RETRIES))
+            conn.set(key, job.get_id(), ex=QUERY_CACHE_TTL + JOB_TIMEOUT)
+            incr(conn, 'mapphone_jobs_enqueued_total', {'kind': 'scrape'})
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                # Expired while we worked; the job ID is stored either way.
+                pass
         return jsonify({'job_id': job.get_id()})
     except Exception as e:
         logging.error(f"Error enqueuing job: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/start_batch', methods=['POST'])
+def start_batch():
+    """Enqueue one job that scrapes a list of search terms on a single warm browser."""
+    search_terms = (request.json or {}).get('search_terms')
+    if not isinstance(search_terms, list) or not search_terms:
+        return jsonify({'error': 'search_terms must be a non-empty list'}), 400
+    # Drop blanks and repeats (ignoring case and spacing), keeping the caller's order
+    unique_terms = {}
+    for term in search_terms:
+        if isinstance(term, str) and term.strip():
+            unique_terms.setdefault(query_key(term), term.strip())
+    terms = list(unique_terms.values())
+    if not terms:
+        return jsonify({'error': 'search_terms must contain at least one search term'}), 400
+    if len(terms) > BATCH_MAX_TERMS:
+        return jsonify({'error': f'At most {BATCH_MAX_TERMS} search terms per batch'}), 400
+
+    logging.info(f"Enqueuing batch scrape for {len(terms)} search terms")
+    try:
+        from worker import run_batch_task
+        job = q.enqueue(run_batch_task, terms, job_timeout=BATCH_TERM_TIMEOUT * len(terms),
+                        result_ttl=QUERY_CACHE_TTL, retry=Retry(max=JOB_RETRIES))
+        incr(conn, 'mapphone_jobs_enqueued_total', {'kind': 'batch'})
+        return jsonify({'job_id': job.get_id(), 'terms': len(terms)})
+    except Exception as e:
+        logging.error(f"Error enqueuing batch job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/batch_status/<job_id>')
+def batch_status(job_id):
+    """Report a batch job's overall status and the status of each of its search terms."""
+    job = q.fetch_job(job_id)
+    if job is None:
+        return jsonify({'status': 'not_found'}), 404
+    status = {'finished': 'complete', 'failed': 'failed'}.get(job.get_status(), 'running')
+    response = {
+        'status': status,
+        'terms': job.meta.get('terms', []),
+        'progress': job.meta.get('progress')
+    }
+    if status == 'complete':
+        response.update(download_links(job_id), result=f'/scrape_status/{job_id}')
+    return jsonify(response)
+
+def finished_result(job):
+    """Serve a finished job's result from its cached serialization, building that once if needed."""
+    cached = load_result(conn, job.id) or store_result(conn, job.id, job.result, job.meta.get('performance'))
+    offset = request.args.get('offset', type=int)
+    limit = request.args.get('limit', type=int)
+    paged = offset is not None or limit is not None
+    compress = not paged and 'gzip' in request.accept_encodings
+    if paged:
+        offset = max(offset or 0, 0)
+        limit = min(max(limit if limit is not None else RESULT_PAGE_SIZE, 0), RESULT_MAX_PAGE_SIZE)
+        etag = f"{cached['etag']}-{offset}-{limit}"
+    else:
+        etag = cached['etag'] + ('-gz' if compress else '')
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif paged:
+        response = Response(result_page(conn, job.id, offset, limit, cached['count']), mimetype='application/json')
+    elif compress:
+        response = Response(cached['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(cached['gzip']), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/scrape_status/<job_id>')
 def scrape_status(job_id):
-    """Check the status of a scraping job and get results."""
+    """Check the status of a scraping job and get results.
+
+    While the job runs, returns its progress and the rows extracted since ?cursor=N.
+    Finished results support ?offset=&limit= paging and If-None-Match. Every response
+    except result pages carries the job's per-phase timing summary as 'performance'.
+    """
     job = q.fetch_job(job_id)
     if job is None:
         return jsonify({'status': 'not_found'}), 404
 
     if job.is_finished:
-        businesses = job.result
-        if not businesses:
-            return jsonify({'status': 'complete', 'result': []})
-        
-        results = [{
-            'business_name': name,
-            'website': website or 'N/A',
-            'phone': phone or 'N/A'
-        } for name, website, phone in businesses]
-
-        return jsonify({
-            'status': 'complete',
-            'result': results,
-            'websites_csv': '/download/websites.csv',
-            'phones_csv': '/download/phones.csv'
-        })
+        return finished_result(job)
     elif job.is_failed:
         error_message = str(job.exc_info) if job.exc_info else "Unknown error occurred"
-        return jsonify({'status': 'failed', 'error': error_message}), 500
+        return jsonify({'status': 'failed', 'error': error_message,
+                        'performance': job.meta.get('performance')}), 500
     else:
-        return jsonify({'status': 'running'})
+        # Rows extracted since the client's cursor, so the UI can fill the table as the job runs.
+        cursor = request.args.get('cursor', 0, type=int)
+        rows, cursor = read_rows(conn, job_id, cursor)
+        return jsonify({
+            'status': 'running',
+            'progress': job.meta.get('progress'),
+            'performance': job.meta.get('performance'),
+            'rows': rows,
+            'cursor': cursor
+        })
+
+def sse_message(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    message = f'event: {event}\ndata: {json.dumps(data)}\n'
+    if event_id is not None:
+        message = f'id: {event_id}\n' + message
+    return message + '\n'
+
+@app.route('/scrape_events/<job_id>')
+def scrape_events(job_id):
+    """Stream a job's progress and new rows as Server-Sent Events.
+
+    Replays the rows after Last-Event-ID (or ?cursor=N), then relays the worker's
+    pub/sub events until the job ends or SSE_MAX_SECONDS pass. Row event IDs are the
+    row cursor. At most SSE_MAX_STREAMS streams run per process; beyond that the
+    answer is 503 with Retry-After.
+    """
+    job = q.fetch_job(job_id)
+    if job is None:
+        return jsonify({'status': 'not_found'}), 404
+    # A malformed Last-Event-ID (it is client-controlled) falls back to ?cursor, then to the start.
+    last_event_id = request.headers.get('Last-Event-ID', '').strip()
+    cursor = int(last_event_id) if last_event_id.isdigit() else max(request.args.get('cursor', 0, type=int), 0)
+    if not sse_slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many open event streams; poll /scrape_status instead'})
+        response.headers['Retry-After'] = str(SSE_HEARTBEAT_SECONDS)
+        return response, 503
+
+    def stream():
+        pubsub = conn.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before reading the snapshot so nothing published in between is missed.
+        pubsub.subscribe(events_channel(job_id))
+        try:
+            rows, next_cursor = read_rows(conn, job_id, cursor)
+            for index, row in enumerate(rows, cursor):
+                yield sse_message('row', {'index': index, 'row': row}, index + 1)
+            if job.meta.get('progress'):
+                yield sse_message('progress', job.meta['progress'])
+
+            deadline = time.time() + SSE_MAX_SECONDS
+            check_status = True
+            while time.time() < deadline:
+                if check_status:
+                    # Covers jobs that ended before we subscribed or whose worker died without publishing.
+                    status = job.get_status()
+                    if status == 'finished':
+                        yield sse_message('done', {})
+                        return
+                    if status == 'failed':
+                        yield sse_message('failed', {'error': 'Scraping job failed.'})
+                        return
+                message = pubsub.get_message(timeout=SSE_HEARTBEAT_SECONDS)
+                check_status = message is None
+                if message is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                event = json.loads(message['data'])
+                data = event['data']
+                if event['event'] == 'row':
+                    if data['index'] < next_cursor:
+                        continue
+                    yield sse_message('row', data, data['index'] + 1)
+                else:
+                    yield sse_message(event['event'], data)
+                if event['event'] in ('done', 'failed'):
+                    return
+        finally:
+            pubsub.close()
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes the response when the stream ends or the client goes away.
+    response.call_on_close(sse_slots.release)
+    return response
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Report how often known places were answered without a page visit, by the dedup index or the place cache."""
+    return jsonify(DedupIndex(conn, fallback=PlaceCache(conn)).stats())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: job and page counters kept by the API and workers, plus live RQ queue stats."""
+    try:
+        return Response(render_metrics(conn), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logging.error(f"Error rendering metrics: {str(e)}")
+        return Response(f'# metrics unavailable: {str(e)}\n', status=500, mimetype='text/plain')
 
-@app.route('/download/<filename>')
-def download_file(filename):
-    """Serve CSV files for download."""
-    if filename not in ['websites.csv', 'phones.csv']:
+@app.route('/download/<job_id>/<filename>')
+def download_file(job_id, filename):
+    """Serve a job's CSV files for download."""
+    file_path = job_file(job_id, filename)
+    if file_path is None:
         return jsonify({'error': 'Invalid file'}), 400
-    file_path = os.path.join(os.getcwd(), filename)
+    if not os.path.exists(file_path) and os.path.exists(f'{file_path}.part'):
+        # The job is still running; serve what has been written so far.
+        return send_file(f'{file_path}.part', as_attachment=True, download_name=filename)
     if not os.path.exists(file_path):
         return jsonify({'error': f'{filename} not found'}), 404
     return send_file(file_path, as_attachment=True)
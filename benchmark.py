@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import resource
+from datetime import datetime
+
+# The benchmark needs no display.
+os.environ.setdefault("HEADLESS", "true")
+
+from scrape_maps_phones import CsvSink, scrape_google_maps
+from driver_pool import DriverPool
+from spans import SpanRecorder
+from throttle import AdaptiveThrottle
+from fake_maps import start_server
+
+SEARCH_TERM = "dental clinics in testville"
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid):
+    """PIDs of every descendant of pid, from /proc (Linux only)."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    found, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        kids = [child for child, ppid in parents.items() if ppid == parent]
+        found.extend(kids)
+        frontier.extend(kids)
+    return found
+
+
+class MemorySampler:
+    """Track peak RSS of this Python process and of its chromedriver/Chrome descendants, in MB."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.python_mb = 0.0
+        self.chrome_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        pid = os.getpid()
+        self.python_mb = max(self.python_mb, _rss_kb(pid) / 1024)
+        if os.path.isdir("/proc"):
+            self.chrome_mb = max(self.chrome_mb, sum(_rss_kb(child) for child in _children(pid)) / 1024)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+class PhaseRecorder:
+    """Progress listener for scrape_google_maps that timestamps phase changes and pages."""
+
+    def __init__(self):
+        self.marks = []
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def set_phase(self, phase):
+        with self._lock:
+            self.marks.append((phase, time.perf_counter()))
+
+    def link_discovered(self, count=1):
+        pass
+
+    def page_done(self, business, added):
+        with self._lock:
+            self.pages += 1
+
+    def update_meta(self, key, value):
+        pass
+
+    def durations(self, end):
+        """Seconds spent in each phase, from one set_phase() to the next (or to `end`)."""
+        times = {}
+        for (phase, start), (_, stop) in zip(self.marks, self.marks[1:] + [(None, end)]):
+            times[phase] = round(times.get(phase, 0) + stop - start, 3)
+        return times
+
+
+def run_once(size, concurrency, mode, knobs, max_time):
+    """Scrape a fresh fake Maps site with `size` results and return this run's measurements."""
+    server, maps_url = start_server(results=size, **knobs)
+    spans = SpanRecorder()
+    recorder = PhaseRecorder()
+    # The benchmark measures the pipeline, not politeness limits: every browser may work at once
+    # with no gap between requests, and no run inherits another run's backoff.
+    rate_limiter = AdaptiveThrottle(min_interval=0, max_concurrent=concurrency, floor=0, limit=concurrency)
+    pool = DriverPool(size=concurrency)
+    driver = None
+    try:
+        with MemorySampler() as memory, tempfile.TemporaryDirectory() as output_dir:
+            # Every browser the run will use is started up front; the extra ones wait warm in
+            # the pool, so extraction borrows them instead of cold-starting Chrome mid-run.
+            started = time.perf_counter()
+            drivers = [pool.acquire() for _ in range(concurrency)]
+            driver, extra_drivers = drivers[0], drivers[1:]
+            for extra in extra_drivers:
+                pool.release(extra)
+            driver_seconds = time.perf_counter() - started
+            if not all(drivers):
+                raise RuntimeError("Chrome could not be started")
+            started = time.perf_counter()
+            with CsvSink(output_dir) as sink:
+                businesses = scrape_google_maps(SEARCH_TERM, max_time=max_time, driver=driver, pool=pool,
+                                                concurrency=concurrency, mode=mode, sink=sink, progress=recorder,
+                                                base_url=maps_url, spans=spans, rate_limiter=rate_limiter)
+            ended = time.perf_counter()
+        # Starting the browsers is reported as its own phase, not counted against throughput.
+        elapsed = ended - started
+        phases = dict(driver_setup=round(driver_seconds, 3), **recorder.durations(ended))
+        summary = spans.summary()
+        phases["export"] = summary.get("export", {}).get("total_seconds", 0.0)
+        pages = summary.get("detail_page", {})
+        return {
+            "size": size,
+            "concurrency": concurrency,
+            "mode": mode,
+            "businesses": len(businesses),
+            "pages": pages.get("count", 0),
+            "elapsed_seconds": round(elapsed, 3),
+            "businesses_per_second": round(len(businesses) / elapsed, 3) if elapsed else None,
+            "page_latency_seconds": {"p50": pages.get("p50_seconds"), "p95": pages.get("p95_seconds")},
+            "phase_seconds": phases,
+            "spans": summary,
+            "peak_rss_mb": {"python": round(memory.python_mb, 1), "chrome": round(memory.chrome_mb, 1)}
+        }
+    finally:
+        pool.release(driver, discard=True)
+        pool.close()
+        server.shutdown()
+
+
+def _revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scrape pipeline against the local fake Maps site.")
+    parser.add_argument("--sizes", type=_int_list, default=[20, 60, 120], help="result counts, e.g. 20,60,120")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 2, 4], help="browser counts, e.g. 1,2,4")
+    parser.add_argument("--mode", choices=["detail", "feed"], default="detail")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pagination", choices=["scroll", "pages"], default="scroll")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake site adds to every response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--max-time", type=int, default=600)
+    parser.add_argument("--output", default="-", help="JSON report path, or - for stdout")
+    args = parser.parse_args(argv)
+
+    knobs = dict(page_size=args.page_size, pagination=args.pagination, latency=args.latency,
+                 jitter=args.jitter, fail_rate=args.fail_rate)
+    started_at = datetime.utcnow().isoformat() + "Z"
+    runs = []
+    for size in args.sizes:
+        for concurrency in args.concurrency:
+            logging.info(f"Benchmark: {size} results, {concurrency} browsers, {args.mode} mode")
+            runs.append(run_once(size, concurrency, args.mode, knobs, args.max_time))
+
+    report = {
+        "revision": _revision(),
+        "started_at": started_at,
+        "python": sys.version.split()[0],
+        "settings": dict(knobs, mode=args.mode, max_time=args.max_time),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "runs": runs
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        logging.info(f"Benchmark report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", str(24 * 3600)))
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "5"))
+
+
+def checkpoint_key(search_term):
+    """Redis key prefix for a search term's checkpoint, ignoring case and extra whitespace."""
+    normalized = " ".join(search_term.lower().split())
+    return "checkpoint:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    """Redis checkpoint of one search term's link frontier and finished extractions.
+
+    scrape_google_maps records every harvested link and every extracted page here. Writes
+    are buffered and flushed at most every CHECKPOINT_INTERVAL seconds (default 5) and on
+    flush(), so a job killed by its timeout or a worker restart loses a few seconds of work
+    at most. The next scrape of the same term calls load(), skips the finished links and
+    continues from the frontier; finish() drops the checkpoint once the term is complete.
+    Checkpoints expire after CHECKPOINT_TTL seconds (default one day).
+    """
+
+    def __init__(self, conn, search_term, ttl=None, interval=None):
+        self.conn = conn
+        self.key = checkpoint_key(search_term)
+        self.ttl = ttl or CHECKPOINT_TTL
+        self.interval = CHECKPOINT_INTERVAL if interval is None else interval
+        self.frontier = []
+        self.done = {}
+        self.harvested = False
+        self.complete = False
+        self._links = []
+        self._results = {}
+        self._harvested = False
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def _keys(self):
+        return f"{self.key}:frontier", f"{self.key}:done", f"{self.key}:harvested"
+
+    def load(self):
+        """Read the saved frontier, finished pages and harvest flag. Returns True if there was any."""
+        frontier_key, done_key, harvested_key = self._keys
+        try:
+            pipe = self.conn.pipeline()
+            pipe.lrange(frontier_key, 0, -1)
+            pipe.hgetall(done_key)
+            pipe.get(harvested_key)
+            links, done, harvested = pipe.execute()
+        except Exception as e:
+            logging.warning(f"Could not load checkpoint {self.key}: {str(e)}")
+            return False
+        # Two jobs for the same term (a batch and a single scrape) both append to the frontier;
+        # keep the first occurrence of each link so a resume visits it once.
+        self.frontier = list(dict.fromkeys(link.decode() for link in links))
+        self.done = {url.decode(): tuple(json.loads(info)) for url, info in done.items()}
+        # Older checkpoints may hold empty (blocked) pages; those still need a visit.
+        self.done = {url: info for url, info in self.done.items() if any(info)}
+        self.harvested = bool(harvested)
+        return bool(self.frontier or self.done)
+
+    def add_link(self, url):
+        with self._lock:
+            self._links.append(url)
+            self._maybe_flush()
+
+    def add_result(self, url, info):
+        """Record a finished page. Empty results are ignored so the page is retried on resume."""
+        if not any(info):
+            return
+        with self._lock:
+            self._results[url] = info
+            self._maybe_flush()
+
+    def set_harvested(self):
+        """Record that the frontier holds every link for the term, then flush."""
+        with self._lock:
+            self.harvested = self._harvested = True
+            self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def finish(self):
+        """Mark the term complete and delete its checkpoint."""
+        self.complete = True
+        with self._lock:
+            self._links, self._results, self._harvested = [], {}, False
+            try:
+                self.conn.delete(*self._keys)
+            except Exception as e:
+                logging.warning(f"Could not delete checkpoint {self.key}: {str(e)}")
+
+    def _maybe_flush(self):
+        if time.time() - self._last_flush >= self.interval:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.time()
+        if not (self._links or self._results or self._harvested):
+            return
+        frontier_key, done_key, harvested_key = self._keys
+        try:
+            pipe = self.conn.pipeline()
+            if self._links:
+                pipe.rpush(frontier_key, *self._links)
+            if self._results:
+                pipe.hset(done_key, mapping={url: json.dumps(info) for url, info in self._results.items()})
+            if self._harvested:
+                pipe.set(harvested_key, 1)
+            for key in self._keys:
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            # Keep the buffers so the next flush tries again.
+            logging.warning(f"Could not save checkpoint {self.key}: {str(e)}")
+            return
+        self._links, self._results, self._harvested = [], {}, False
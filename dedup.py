@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import logging
+from urllib.parse import urlparse
+from place_cache import normalize_place_url
+
+
+def normalize_phone(phone, country_code=None):
+    """Best-effort E.164 form of a phone number.
+
+    International numbers (+.. or 00..) are kept as is; national numbers with a trunk 0
+    get DEFAULT_COUNTRY_CODE when it is set. Anything else is returned as bare digits.
+    """
+    if not phone:
+        return ""
+    digits = re.sub(r"\D", "", phone)
+    if phone.strip().startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    country_code = country_code or os.getenv("DEFAULT_COUNTRY_CODE", "")
+    if country_code and digits.startswith("0"):
+        return f"+{country_code}{digits[1:]}"
+    return digits
+
+
+def normalize_domain(website):
+    """Registered host of a website URL, lower-cased and without www."""
+    if not website:
+        return ""
+    host = urlparse(website if "//" in website else f"//{website}").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_name(name):
+    """Business name reduced to lower-case letters and digits."""
+    return re.sub(r"[\W_]+", "", (name or "").lower())
+
+
+def business_keys(business, url=None):
+    """Identifiers of a (name, website, phone), strongest first.
+
+    The place ID from a Maps URL identifies a business on its own. Phone and domain are
+    only paired with the name: chains and franchises often share a switchboard number or
+    a website, and two places with different place IDs are never the same business.
+    """
+    name, website, phone = business
+    keys = [("place", normalize_place_url(url))] if url else []
+    if phone:
+        keys.append(("phone", normalize_phone(phone), normalize_name(name)))
+    if website:
+        keys.append(("domain", normalize_domain(website), normalize_name(name)))
+    if not (phone or website) and normalize_name(name):
+        keys.append(("name", normalize_name(name)))
+    return keys
+
+
+def merge_business(existing, new):
+    """Combine two records for the same business: keep existing values, fill blanks from new."""
+    return tuple(old or fresh for old, fresh in zip(existing, new))
+
+
+class BusinessSet:
+    """In-memory deduplication of businesses, in the order they were first added.
+
+    add() matches on the place ID first. Only when one side has no place URL does a
+    (phone, name), (domain, name) or bare-name match count, so the same place seen
+    once with a phone and once without is merged, while distinct places sharing a
+    number stay apart. Not thread-safe; callers that share one hold their own lock.
+    """
+
+    def __init__(self):
+        self._records = []
+        self._places = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def values(self):
+        return list(self._records)
+
+    def _match(self, place, keys):
+        if place and ("place", place) in self._index:
+            return self._index[("place", place)]
+        for key in keys:
+            position = self._index.get(key)
+            if position is not None and not (place and self._places[position] not in ("", place)):
+                return position
+        return None
+
+    def add(self, business, url=None):
+        """Add or merge a (name, website, phone). Returns True if it is a new business."""
+        keys = business_keys(business, url)
+        place = keys[0][1] if url else ""
+        position = self._match(place, keys[1:] if url else keys)
+        new = position is None
+        if new:
+            position = len(self._records)
+            self._records.append(tuple(business))
+            self._places.append(place)
+        else:
+            self._records[position] = merge_business(self._records[position], business)
+            self._places[position] = self._places[position] or place
+        for key in business_keys(self._records[position], url):
+            # The first business to claim an identifier keeps it.
+            self._index.setdefault(key, position)
+        return new
+
+
+class DedupIndex:
+    """Persistent Redis index of businesses across queries.
+
+    Each business gets one record, reachable from its canonical place ID and from its
+    (E.164 phone, name) and (domain, name), matched the way BusinessSet does. It speaks the
+    same get(url)/set(url, info) protocol as PlaceCache so it can stand in front of one in
+    extract_businesses: indexed places younger than DEDUP_MAX_AGE seconds (default 30 days)
+    are never extracted again, and everything that is extracted is merged into the index.
+    Merges run in WATCH/MULTI transactions, so workers racing on one business agree on its ID.
+    """
+
+    def __init__(self, conn, fallback=None, max_age=None, prefix="dedup:"):
+        self.conn = conn
+        self.fallback = fallback
+        self.max_age = max_age or int(os.getenv("DEDUP_MAX_AGE", str(30 * 24 * 3600)))
+        self.prefix = prefix
+        self.stats_key = f"{prefix}stats"
+
+    def _index_keys(self, url, business):
+        return [self.prefix + ":".join(key) for key in business_keys(business, url)]
+
+    def _record_key(self, business_id):
+        return f"{self.prefix}business:{business_id}"
+
+    def _load(self, conn, business_id):
+        raw = conn.get(self._record_key(business_id))
+        return json.loads(raw) if raw else None
+
+    def _lookup(self, conn, url, business, watch=False):
+        """(business_id, record) of the indexed business matching url or business, or (None, None)."""
+        keys = self._index_keys(url, business)
+        place = normalize_place_url(url) if url else ""
+        for i, key in enumerate(keys):
+            business_id = conn.get(key)
+            if not business_id:
+                continue
+            business_id = business_id.decode()
+            if watch:
+                conn.watch(self._record_key(business_id))
+            record = self._load(conn, business_id)
+            if record is None:
+                continue
+            if url and i == 0:
+                return business_id, record
+            # A secondary match must not join two places that both have (different) place IDs.
+            if not (place and record.get("place") and record["place"] != place):
+                return business_id, record
+        return None, None
+
+    def lookup(self, url=None, business=("", "", "")):
+        """ID of the indexed business matching any of the given identifiers, or None."""
+        return self._lookup(self.conn, url, business)[0]
+
+    def get(self, url):
+        """Indexed (name, website, phone) for a place URL if it is fresh enough, else the fallback's."""
+        try:
+            record = self._lookup(self.conn, url, ("", "", ""))[1]
+        except Exception as e:
+            logging.warning(f"Dedup index lookup failed: {str(e)}")
+            record = None
+        if record and time.time() - record["updated"] <= self.max_age:
+            self._count("hits")
+            return record["name"], record["website"], record["phone"]
+        self._count("misses")
+        return self.fallback.get(url) if self.fallback else None
+
+    def _count(self, field):
+        try:
+            self.conn.hincrby(self.stats_key, field, 1)
+        except Exception as e:
+            logging.warning(f"Could not update dedup index stats: {str(e)}")
+
+    def set(self, url, info):
+        """Merge a freshly extracted business into the index (and the fallback)."""
+        if self.fallback:
+            self.fallback.set(url, info)
+        if not any(info):
+            return
+        try:
+            self.merge(url, info)
+        except Exception as e:
+            logging.warning(f"Dedup index update failed: {str(e)}")
+
+    def stats(self):
+        """Lifetime hit/miss counts and hit rate of get(), index and fallback combined, plus each one's own.
+
+        Index misses are passed on to the fallback, so a lookup is a hit if either answered it.
+        """
+        try:
+            raw = self.conn.hgetall(self.stats_key)
+        except Exception as e:
+            logging.warning(f"Could not read dedup index stats: {str(e)}")
+            raw = {}
+        index_hits = int(raw.get(b"hits", 0))
+        index_misses = int(raw.get(b"misses", 0))
+        stats = {"index": {"hits": index_hits, "misses": index_misses}}
+        hits, misses = index_hits, index_misses
+        if self.fallback:
+            stats["fallback"] = self.fallback.stats()
+            hits += stats["fallback"]["hits"]
+            misses = stats["fallback"]["misses"]
+        total = hits + misses
+        return dict(hits=hits, misses=misses, hit_rate=round(hits / total, 4) if total else 0.0, **stats)
+
+    def merge(self, url, business):
+        """Add or merge a business, link all of its identifiers to it, and return (business_id, merged)."""
+        place = normalize_place_url(url) if url else ""
+
+        def update(pipe):
+            # Every identifier of `business` is watched, so a racing worker that indexes the same
+            # business first makes this transaction fail and retry, and it then finds that record.
+            business_id, record = self._lookup(pipe, url, business, watch=True)
+            if record:
+                # A fresh page visit wins over what we had; blanks never overwrite known values.
+                merged = merge_business(business, (record["name"], record["website"], record["phone"]))
+                place_id = record.get("place") or place
+            else:
+                business_id = str(pipe.incr(f"{self.prefix}next_id"))
+                merged, place_id = tuple(business), place
+            name, website, phone = merged
+            pipe.multi()
+            pipe.set(self._record_key(business_id), json.dumps({
+                "name": name, "website": website, "phone": phone, "place": place_id, "updated": time.time()
+            }))
+            for key in self._index_keys(url, merged):
+                # Identifiers already claimed by another business keep pointing at it.
+                pipe.set(key, business_id, nx=True)
+            return business_id, merged
+
+        return self.conn.transaction(update, *self._index_keys(url, business), value_from_callable=True)
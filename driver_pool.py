@@ -0,0 +1,152 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from scrape_maps_phones import setup_driver
+
+
+class DriverPool:
+    """Keep warm Chrome sessions around so each job doesn't pay for a cold browser start.
+
+    Sessions are health-checked when handed out, reset (tabs, cookies, storage)
+    when returned, and recycled once they exceed max_age seconds or max_uses jobs.
+    """
+
+    def __init__(self, size=None, max_age=None, max_uses=None, acquire_timeout=None, factory=setup_driver):
+        self.size = size or int(os.getenv("DRIVER_POOL_SIZE", os.getenv("EXTRACT_CONCURRENCY", "2")))
+        self.max_age = max_age or float(os.getenv("DRIVER_MAX_AGE", "1800"))
+        self.max_uses = max_uses or int(os.getenv("DRIVER_MAX_USES", "50"))
+        self.acquire_timeout = acquire_timeout or float(os.getenv("DRIVER_POOL_TIMEOUT", "300"))
+        self.factory = factory
+        self._idle = []
+        self._info = {}
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Hand out a healthy driver, starting a new one if the pool has room. Returns None on failure."""
+        deadline = time.time() + (timeout if timeout is not None else self.acquire_timeout)
+        while True:
+            candidate = placeholder = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return None
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        expired = self._is_expired(candidate)
+                        break
+                    if len(self._info) < self.size:
+                        # Reserve the slot before releasing the lock to start Chrome.
+                        placeholder = object()
+                        self._info[id(placeholder)] = None
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        logging.warning("Timed out waiting for a free Chrome session.")
+                        return None
+                    self._cond.wait(remaining)
+            if placeholder:
+                break
+            # The candidate keeps its slot while it is checked; health checks and quitting talk
+            # to Chrome, so they run outside the lock.
+            if not expired and self.is_healthy(candidate):
+                with self._cond:
+                    self._info[id(candidate)]["uses"] += 1
+                logging.info("Reusing warm Chrome session from pool.")
+                return candidate
+            self._discard(candidate)
+
+        driver = None
+        try:
+            driver = self.factory()
+        finally:
+            with self._cond:
+                del self._info[id(placeholder)]
+                if driver:
+                    self._info[id(driver)] = {"created": time.time(), "uses": 1}
+                self._cond.notify()
+        return driver
+
+    def release(self, driver, discard=False):
+        """Return a driver to the pool, resetting it for the next job or quitting it if it is spent."""
+        if driver is None:
+            return
+        with self._cond:
+            if id(driver) not in self._info:
+                return
+            spent = discard or self._closed or self._is_expired(driver)
+        # Resetting talks to Chrome, so keep it outside the lock.
+        reusable = not spent and self._reset(driver)
+        with self._cond:
+            if reusable and not self._closed:
+                self._idle.append(driver)
+                self._cond.notify()
+                return
+        self._discard(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Context manager that acquires a driver and always gives it back."""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """Quit every idle session; busy sessions are quit when they are released."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._closed = True
+        for driver in idle:
+            self._discard(driver)
+
+    def _is_expired(self, driver):
+        info = self._info[id(driver)]
+        return time.time() - info["created"] > self.max_age or info["uses"] >= self.max_uses
+
+    def is_healthy(self, driver):
+        """Whether the session still answers commands."""
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception as e:
+            logging.warning(f"Pooled Chrome session failed health check: {str(e)}")
+            return False
+
+    def _reset(self, driver):
+        """Close extra tabs and clear cookies and storage so jobs don't leak state into each other."""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logging.warning(f"Could not reset pooled Chrome session: {str(e)}")
+            return False
+
+    def _discard(self, driver):
+        """Free the driver's slot, then quit it. Call without holding the lock."""
+        with self._cond:
+            self._info.pop(id(driver), None)
+            self._cond.notify()
+        logging.info("Recycling Chrome session.")
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import shutil
+import logging
+import threading
+import subprocess
+
+MANIFEST_PATH = os.getenv(
+    "CHROMEDRIVER_MANIFEST",
+    os.path.join(os.path.expanduser("~"), ".cache", "mapphone", "chromedriver.json")
+)
+PINNED_PATHS = ["/usr/local/bin/chromedriver", "/usr/bin/chromedriver"]
+CHROME_BINARIES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]
+
+_lock = threading.Lock()
+_driver_path = None
+
+
+def _is_offline():
+    return os.getenv("CHROMEDRIVER_OFFLINE", "false").lower() == "true"
+
+
+def _is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _read_version(binary):
+    """Return the full version string reported by `<binary> --version`, or None."""
+    try:
+        output = subprocess.run(
+            [binary, "--version"], capture_output=True, text=True, timeout=10
+        ).stdout
+    except Exception as e:
+        logging.warning(f"Could not read version of {binary}: {str(e)}")
+        return None
+    match = re.search(r"(\d+)\.\d+\.\d+(\.\d+)?", output)
+    return match.group(0) if match else None
+
+
+def _major(version):
+    return version.split(".")[0] if version else None
+
+
+def find_chrome():
+    """Locate the Chrome binary, honouring CHROME_BINARY."""
+    override = os.getenv("CHROME_BINARY")
+    if override:
+        return override
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def load_manifest():
+    """Read the on-disk manifest written by a previous resolution, if any."""
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(driver_path, driver_version=None, chrome_version=None):
+    """Record the resolved driver so later processes on this host skip the lookup."""
+    try:
+        os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+        tmp_path = f"{MANIFEST_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "driver_path": driver_path,
+                "driver_version": driver_version,
+                "chrome_version": chrome_version
+            }, f)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except OSError as e:
+        logging.warning(f"Could not write chromedriver manifest: {str(e)}")
+
+
+def _resolve():
+    # 1. Explicit override.
+    override = os.getenv("CHROMEDRIVER_PATH")
+    if override:
+        if _is_executable(override):
+            logging.info(f"Using chromedriver from CHROMEDRIVER_PATH: {override}")
+            return override
+        logging.warning(f"CHROMEDRIVER_PATH={override} is not an executable file; ignoring it.")
+
+    # 2. Pinned system locations.
+    for path in PINNED_PATHS + [shutil.which("chromedriver")]:
+        if _is_executable(path):
+            logging.info(f"Using pinned chromedriver: {path}")
+            return path
+
+    # 3. Manifest from an earlier download, unless Chrome has been upgraded since.
+    manifest = load_manifest()
+    path = manifest.get("driver_path")
+    if _is_executable(path):
+        chrome = find_chrome()
+        chrome_version = _read_version(chrome) if chrome else None
+        if not chrome_version or _major(chrome_version) == _major(manifest.get("chrome_version")) or _is_offline():
+            logging.info(f"Using chromedriver from manifest: {path}")
+            return path
+        logging.info("Chrome was upgraded since the manifest was written; resolving chromedriver again.")
+
+    # 4. Last resort: download once and remember it.
+    if _is_offline():
+        logging.error("No local chromedriver found and CHROMEDRIVER_OFFLINE is set.")
+        return None
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        logging.error(f"Error downloading chromedriver: {str(e)}")
+        return None
+    chrome = find_chrome()
+    save_manifest(path, _read_version(path), _read_version(chrome) if chrome else None)
+    return path
+
+
+def get_chromedriver_path():
+    """Return the chromedriver path for this host, resolving it only on the first call."""
+    global _driver_path
+    if _driver_path:
+        return _driver_path
+    with _lock:
+        if not _driver_path:
+            _driver_path = _resolve()
+        return _driver_path
+
+
+def verify_chromedriver():
+    """Resolve chromedriver and check its major version matches Chrome. Meant to run once at boot."""
+    path = get_chromedriver_path()
+    if not path:
+        logging.error("chromedriver could not be resolved; scrapes will fail to start Chrome.")
+        return False
+    chrome = find_chrome()
+    if not chrome:
+        logging.warning("Chrome binary not found; skipping chromedriver version check.")
+        return True
+    driver_version = _read_version(path)
+    chrome_version = _read_version(chrome)
+    if _major(driver_version) != _major(chrome_version):
+        logging.error(f"chromedriver {driver_version} does not match Chrome {chrome_version}.")
+        return False
+    logging.info(f"chromedriver {driver_version} matches Chrome {chrome_version}.")
+    return True
@@ -0,0 +1,190 @@
+import os
+import time
+import zlib
+import random
+import logging
+import argparse
+import threading
+from html import escape
+from urllib.parse import quote, unquote
+from flask import Flask, abort, redirect, request
+from werkzeug.serving import make_server
+
+# Stand-in for the parts of Google Maps the scraper touches: the search box, the results
+# feed (scrolled or paged) and place pages with the same h1 / data-item-id markup. Run it
+# with `python fake_maps.py` and point the scraper at it with MAPS_BASE_URL=http://127.0.0.1:8765/maps.
+
+DEFAULTS = {
+    "results": int(os.getenv("FAKE_MAPS_RESULTS", "60")),
+    "page_size": int(os.getenv("FAKE_MAPS_PAGE_SIZE", "20")),
+    "pagination": os.getenv("FAKE_MAPS_PAGINATION", "scroll"),
+    "latency": float(os.getenv("FAKE_MAPS_LATENCY", "0")),
+    "jitter": float(os.getenv("FAKE_MAPS_JITTER", "0")),
+    "fail_rate": float(os.getenv("FAKE_MAPS_FAIL_RATE", "0")),
+    "captcha_rate": float(os.getenv("FAKE_MAPS_CAPTCHA_RATE", "0")),
+    "seed": int(os.getenv("FAKE_MAPS_SEED", "0"))
+}
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title} - Google Maps</title>
+<style>
+div[role='feed'] {{ height: 600px; overflow-y: auto; }}
+div[role='feed'] > div {{ height: 120px; }}
+</style></head>
+<body>{body}</body></html>"""
+
+SEARCH_BODY = """<input id="searchboxinput" autofocus>
+<script>
+document.getElementById("searchboxinput").addEventListener("keydown", function (e) {{
+    if (e.key === "Enter") {{ location.href = "{base}/search/" + encodeURIComponent(this.value); }}
+}});
+</script>"""
+
+# Scroll mode: the feed fetches the next chunk when scrolled to the bottom, as Maps does.
+SCROLL_SCRIPT = """<script>
+var feed = document.querySelector("div[role='feed']");
+var offset = {offset};
+var loading = false;
+feed.addEventListener("scroll", function () {{
+    if (loading || offset >= {total} || feed.scrollTop + feed.clientHeight < feed.scrollHeight - 5) {{ return; }}
+    loading = true;
+    fetch("{base}/feed/{term}?offset=" + offset).then(function (r) {{ return r.text(); }}).then(function (html) {{
+        feed.insertAdjacentHTML("beforeend", html);
+        offset += {page_size};
+        loading = false;
+    }});
+}});
+</script>"""
+
+END_MARKER = "<span class=\"HlvSq\">You've reached the end of the list.</span>"
+
+
+def business(term, index):
+    """The deterministic fake business at `index` in the results for `term`."""
+    salt = zlib.crc32(term.lower().encode("utf-8"))
+    name = f"{term.title()} {index + 1}"
+    slug = quote(name.replace(" ", "+"), safe="+")
+    return {
+        "name": name,
+        "url": f"/place/{slug}/data=!4m2!3m1!1s0x{salt:x}:0x{index:x}!19sChIJ{salt:x}x{index}",
+        # Every third business has no website and every fifth no phone, like real listings.
+        "website": "" if index % 3 == 2 else f"https://www.{slug.lower().replace('+', '-')}.example.com/",
+        "phone": "" if index % 5 == 4 else f"+1 555 {salt % 1000:03d} {index:04d}",
+        "address": f"{index + 1} Example Street, Testville",
+        "rating": f"{3 + (index % 20) / 10:.1f}",
+        "category": term.lower().split(" in ")[0].rstrip("s").title() or "Business"
+    }
+
+
+def create_app(**knobs):
+    """Flask app serving the fake Maps site. Knobs default to DEFAULTS (FAKE_MAPS_* variables).
+
+    results: businesses per search; page_size: results per scroll load or page;
+    pagination: "scroll" or "pages" (a Next button); latency/jitter: seconds added to every
+    response; fail_rate: share of place pages that error out; captcha_rate: share of
+    requests sent to a /sorry/ CAPTCHA page; seed: makes the injected failures repeatable.
+    """
+    config = dict(DEFAULTS, **knobs)
+    rng = random.Random(config["seed"])
+    rng_lock = threading.Lock()
+    app = Flask(__name__)
+    base = "/maps"
+
+    def roll(rate):
+        with rng_lock:
+            return rng.random() < rate
+
+    def delay():
+        with rng_lock:
+            return config["latency"] + rng.uniform(0, config["jitter"])
+
+    def card(term, index):
+        b = business(term, index)
+        website = f'<a href="{escape(b["website"])}">Website</a>' if b["website"] else ""
+        # Only some cards show the phone, so feed mode still has pages to visit.
+        phone = f'<span class="UsdlK">{escape(b["phone"])}</span>' if b["phone"] and index % 2 == 0 else ""
+        return (f'<div><a href="{base}{escape(b["url"])}" aria-label="{escape(b["name"])}">{escape(b["name"])}</a>'
+                f'{website}{phone}</div>')
+
+    def cards(term, offset):
+        end = min(offset + config["page_size"], config["results"])
+        html = "".join(card(term, i) for i in range(offset, end))
+        return html + (END_MARKER if end >= config["results"] and config["pagination"] == "scroll" else "")
+
+    @app.before_request
+    def inject_latency_and_blocks():
+        seconds = delay()
+        if seconds:
+            time.sleep(seconds)
+        if not request.path.startswith("/sorry") and roll(config["captcha_rate"]):
+            return redirect("/sorry/index")
+
+    @app.route("/sorry/index")
+    def captcha():
+        return PAGE.format(title="Unusual traffic", body='<form id="captcha-form">Are you a robot?</form>')
+
+    @app.route(base)
+    def search_page():
+        return PAGE.format(title="Search", body=SEARCH_BODY.format(base=base))
+
+    @app.route(f"{base}/search/<path:term>")
+    def results_page(term):
+        term = unquote(term)
+        page = max(int(request.args.get("page", 0)), 0)
+        offset = page * config["page_size"] if config["pagination"] == "pages" else 0
+        body = f'<div role="feed">{cards(term, offset)}</div>'
+        if config["pagination"] == "pages":
+            last = offset + config["page_size"] >= config["results"]
+            target = f"{base}/search/{quote(term)}?page={page + 1}"
+            body += (f'<button aria-label="Next page" {"disabled" if last else ""} '
+                     f'onclick="location.href=\'{target}\'">Next</button>')
+        else:
+            body += SCROLL_SCRIPT.format(base=base, term=quote(term), offset=config["page_size"],
+                                         total=config["results"], page_size=config["page_size"])
+        return PAGE.format(title=escape(term), body=body)
+
+    @app.route(f"{base}/feed/<path:term>")
+    def feed_chunk(term):
+        return cards(unquote(term), max(int(request.args.get("offset", 0)), 0))
+
+    @app.route(f"{base}/place/<name>/<path:data>")
+    def place_page(name, data):
+        term, _, number = unquote(name).replace("+", " ").rpartition(" ")
+        if not number.isdigit() or not 0 < int(number) <= config["results"]:
+            abort(404)
+        if roll(config["fail_rate"]):
+            abort(503)
+        b = business(term, int(number) - 1)
+        parts = [f'<h1>{escape(b["name"])}</h1>',
+                 f'<button class="DkEaL">{escape(b["category"])}</button>',
+                 f'<div class="F7nice"><span aria-hidden="true">{b["rating"]}</span></div>',
+                 f'<button data-item-id="address" aria-label="Address: {escape(b["address"])}"></button>']
+        if b["website"]:
+            parts.append(f'<a data-item-id="authority" href="{escape(b["website"])}">Website</a>')
+        if b["phone"]:
+            digits = b["phone"].replace(" ", "")
+            parts.append(f'<button data-item-id="phone:tel:{digits}" aria-label="Phone: {escape(b["phone"])}"></button>')
+        return PAGE.format(title=escape(b["name"]), body="".join(parts))
+
+    return app
+
+
+def start_server(host="127.0.0.1", port=0, **knobs):
+    """Serve the fake site from a background thread. Returns (server, maps_url); call server.shutdown() when done."""
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server(host, port, create_app(**knobs), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/maps"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for Google Maps.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for knob, default in DEFAULTS.items():
+        parser.add_argument(f"--{knob.replace('_', '-')}", dest=knob, type=type(default), default=default)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    logging.basicConfig(level=logging.INFO)
+    logging.info(f"Fake Maps at http://{host}:{port}/maps")
+    create_app(**args).run(host=host, port=port, threaded=True)
@@ -0,0 +1,119 @@
+import os
+import socket
+import logging
+from datetime import datetime
+from rq import Queue, Worker
+from rq.registry import (StartedJobRegistry, FinishedJobRegistry, FailedJobRegistry, DeferredJobRegistry,
+                         ScheduledJobRegistry)
+
+# Counters and histograms live in one Redis hash, keyed by their Prometheus series
+# (e.g. 'mapphone_jobs_total{kind="scrape",status="finished"}'), so any process can update
+# them with HINCRBY and /metrics only has to read one key.
+METRICS_KEY = "metrics:series"
+QUEUE_NAMES = ("high", "default", "low")
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+# Label for per-worker series. It must stay the same across restarts (one series per
+# machine, not per process), so set WORKER_NAME when a host runs several workers.
+WORKER_NAME = os.getenv("WORKER_NAME") or socket.gethostname()
+
+FAMILIES = {
+    "mapphone_jobs_enqueued_total": ("counter", "Jobs enqueued by the API."),
+    "mapphone_query_reuse_total": ("counter", "Scrape requests answered by an existing job."),
+    "mapphone_jobs_total": ("counter", "Job attempts ended by workers, by outcome (finished, retried or failed)."),
+    "mapphone_job_wait_seconds": ("histogram", "Time jobs spent queued before a worker started them."),
+    "mapphone_job_duration_seconds": ("histogram", "Time workers spent running jobs."),
+    "mapphone_pages_total": ("counter", "Business pages processed (visited, cached or resumed), per worker."),
+    "mapphone_detail_pages_total": ("counter", "Detail page visits of ended jobs, by outcome."),
+    "mapphone_businesses_total": ("counter", "Businesses returned by finished jobs."),
+    "mapphone_rq_queue_jobs": ("gauge", "Jobs waiting in each RQ queue."),
+    "mapphone_rq_oldest_job_age_seconds": ("gauge", "Age of the oldest job waiting in each RQ queue."),
+    "mapphone_rq_registry_jobs": ("gauge", "Jobs in each RQ registry, per queue."),
+    "mapphone_rq_workers": ("gauge", "RQ workers registered in Redis.")
+}
+
+
+def _series(name, labels=None):
+    if not labels:
+        return name
+    # le goes last so the buckets of one histogram series sort together.
+    items = sorted((key, value) for key, value in labels.items() if key != "le")
+    if "le" in labels:
+        items.append(("le", labels["le"]))
+    pairs = ",".join(f'{key}="{str(value)}"' for key, value in items)
+    return f"{name}{{{pairs}}}"
+
+
+def incr(conn, name, labels=None, amount=1):
+    """Add `amount` to a counter. Redis errors are logged, never raised."""
+    try:
+        conn.hincrbyfloat(METRICS_KEY, _series(name, labels), amount)
+    except Exception as e:
+        logging.warning(f"Could not update metric {name}: {str(e)}")
+
+
+def observe(conn, name, value, labels=None, buckets=DURATION_BUCKETS):
+    """Record one observation in a histogram. Redis errors are logged, never raised."""
+    labels = labels or {}
+    try:
+        pipe = conn.pipeline()
+        for bound in buckets:
+            # Zero increments still create the field, so every bucket is exported.
+            pipe.hincrby(METRICS_KEY, _series(f"{name}_bucket", dict(labels, le=bound)), int(value <= bound))
+        pipe.hincrby(METRICS_KEY, _series(f"{name}_bucket", dict(labels, le="+Inf")), 1)
+        pipe.hincrbyfloat(METRICS_KEY, _series(f"{name}_sum", labels), value)
+        pipe.hincrby(METRICS_KEY, _series(f"{name}_count", labels), 1)
+        pipe.execute()
+    except Exception as e:
+        logging.warning(f"Could not update metric {name}: {str(e)}")
+
+
+def _family(series):
+    name = series.split("{", 1)[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _sort_key(series):
+    # Histogram buckets in increasing order of their upper bound, +Inf last.
+    if 'le="' not in series:
+        return series, 0
+    head, le = series.split('le="', 1)
+    le = le.split('"', 1)[0]
+    return head, float("inf") if le == "+Inf" else float(le)
+
+
+def _queue_series(conn, queue_names):
+    """Gauges for RQ queues, registries and workers, read live from Redis."""
+    series = {}
+    now = datetime.utcnow()
+    for name in queue_names:
+        queue = Queue(name, connection=conn)
+        series[_series("mapphone_rq_queue_jobs", {"queue": name})] = queue.count
+        oldest = queue.job_ids[:1]
+        job = queue.fetch_job(oldest[0]) if oldest else None
+        age = (now - job.enqueued_at).total_seconds() if job and job.enqueued_at else 0
+        series[_series("mapphone_rq_oldest_job_age_seconds", {"queue": name})] = round(age, 3)
+        for registry, cls in (("started", StartedJobRegistry), ("finished", FinishedJobRegistry),
+                              ("failed", FailedJobRegistry), ("deferred", DeferredJobRegistry),
+                              ("scheduled", ScheduledJobRegistry)):
+            labels = {"queue": name, "registry": registry}
+            series[_series("mapphone_rq_registry_jobs", labels)] = cls(queue=queue).count
+    series["mapphone_rq_workers"] = Worker.count(connection=conn)
+    return series
+
+
+def render(conn, queue_names=QUEUE_NAMES):
+    """All metrics in the Prometheus text exposition format."""
+    series = {key.decode(): value.decode() for key, value in conn.hgetall(METRICS_KEY).items()}
+    series.update(_queue_series(conn, queue_names))
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        members = sorted((key for key in series if _family(key) == family), key=_sort_key)
+        if not members:
+            continue
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(f"{key} {series[key]}" for key in members)
+    return "\n".join(lines) + "\n"
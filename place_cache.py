@@ -0,0 +1,86 @@
+import os
+import re
+import json
+import logging
+from urllib.parse import urlparse, unquote
+
+# Maps place URLs carry a stable place ID (!19sChIJ...) and/or feature ID (!1s0x...:0x...)
+# in their data= segment; either identifies the business regardless of how we reached it.
+PLACE_ID_RE = re.compile(r"!19s(ChIJ[\w-]+)")
+FEATURE_ID_RE = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.IGNORECASE)
+
+
+def normalize_place_url(url):
+    """Reduce a /maps/place/ URL to a stable cache key."""
+    if not url:
+        return ""
+    match = PLACE_ID_RE.search(url)
+    if match:
+        return f"pid:{match.group(1)}"
+    match = FEATURE_ID_RE.search(url)
+    if match:
+        return f"fid:{match.group(1).lower()}"
+    path = unquote(urlparse(url).path)
+    name = path.split("/maps/place/", 1)[-1].split("/", 1)[0]
+    return f"name:{name.lower()}"
+
+
+class PlaceCache:
+    """Redis cache of (name, website, phone) per place so known businesses aren't fetched again.
+
+    Entries expire after PLACE_CACHE_TTL seconds (default one week). Redis failures are
+    logged and treated as misses so the cache can never stop a scrape.
+    """
+
+    STATS_KEY = "place_cache:stats"
+
+    def __init__(self, conn, ttl=None, prefix="place:"):
+        self.conn = conn
+        self.ttl = ttl or int(os.getenv("PLACE_CACHE_TTL", str(7 * 24 * 3600)))
+        self.prefix = prefix
+
+    def _key(self, url):
+        return f"{self.prefix}{normalize_place_url(url)}"
+
+    def get(self, url):
+        """Return the cached (name, website, phone) for url, or None."""
+        try:
+            raw = self.conn.get(self._key(url))
+            self.conn.hincrby(self.STATS_KEY, "hits" if raw else "misses", 1)
+        except Exception as e:
+            logging.warning(f"Place cache lookup failed: {str(e)}")
+            return None
+        if not raw:
+            return None
+        data = json.loads(raw)
+        return data["name"], data["website"], data["phone"]
+
+    def set(self, url, info):
+        """Store a scraped (name, website, phone); empty results are not cached."""
+        name, website, phone = info
+        if not (name or website or phone):
+            return
+        try:
+            self.conn.set(
+                self._key(url),
+                json.dumps({"name": name, "website": website, "phone": phone}),
+                ex=self.ttl
+            )
+        except Exception as e:
+            logging.warning(f"Place cache write failed: {str(e)}")
+
+    def stats(self):
+        """Lifetime hit/miss counts and hit rate."""
+        try:
+            raw = self.conn.hgetall(self.STATS_KEY)
+        except Exception as e:
+            logging.warning(f"Could not read place cache stats: {str(e)}")
+            raw = {}
+        hits = int(raw.get(b"hits", 0))
+        misses = int(raw.get(b"misses", 0))
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0
+        }
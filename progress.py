@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import logging
+import threading
+from metrics import incr, WORKER_NAME
+
+PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", str(24 * 3600)))
+
+
+def rows_key(job_id):
+    """Redis list holding the rows a job has extracted so far, as JSON strings."""
+    return f"job:{job_id}:rows"
+
+
+def events_channel(job_id):
+    """Redis pub/sub channel carrying a job's progress, row, done and failed events."""
+    return f"job:{job_id}:events"
+
+
+def business_row(business):
+    """The dict shape the API and UI use for one (name, website, phone)."""
+    name, website, phone = business
+    return {
+        'business_name': name,
+        'website': website or 'N/A',
+        'phone': phone or 'N/A'
+    }
+
+
+def read_rows(conn, job_id, cursor=0):
+    """Rows extracted since `cursor`, plus the cursor to pass next time."""
+    raw = conn.lrange(rows_key(job_id), cursor, -1)
+    return [json.loads(row) for row in raw], cursor + len(raw)
+
+
+class JobProgress:
+    """Publish a running scrape's progress to RQ job.meta and its new rows to a Redis list.
+
+    The scraper calls set_phase(), link_discovered() and page_done() from any thread;
+    job.meta is saved at most once per `min_interval` seconds, except on phase changes.
+    Every save and every new row is also published on the job's events channel, and the pages
+    extracted since the previous save are added to mapphone_pages_total. With a
+    SpanRecorder as `spans`, each save also stores its summary in job.meta['performance'].
+    """
+
+    def __init__(self, job, conn, min_interval=1.0, spans=None):
+        self.job = job
+        self.conn = conn
+        self.spans = spans
+        self.min_interval = min_interval
+        self.started_at = time.time()
+        self.extract_started_at = None
+        self.phase = "starting"
+        self.links_discovered = 0
+        self.pages_extracted = 0
+        self.businesses_found = 0
+        self.phones_found = 0
+        self._pages_unrecorded = 0
+        self._last_save = 0
+        self._lock = threading.Lock()
+
+    def reset_rows(self):
+        """Drop rows published by an earlier attempt of this job; a resumed scrape republishes them."""
+        try:
+            self.conn.delete(rows_key(self.job.id))
+        except Exception as e:
+            logging.warning(f"Could not reset rows for job {self.job.id}: {str(e)}")
+
+    def set_phase(self, phase):
+        with self._lock:
+            self.phase = phase
+            self._save(force=True)
+
+    def link_discovered(self, count=1):
+        with self._lock:
+            self.links_discovered += count
+            self._save()
+
+    def page_done(self, business, added):
+        """Record one extracted page; `added` says whether it produced a new, non-duplicate business."""
+        with self._lock:
+            if self.extract_started_at is None:
+                self.extract_started_at = time.time()
+            self.pages_extracted += 1
+            self._pages_unrecorded += 1
+            if added:
+                self.businesses_found += 1
+                if business[2]:
+                    self.phones_found += 1
+                try:
+                    key = rows_key(self.job.id)
+                    row = business_row(business)
+                    index = self.conn.rpush(key, json.dumps(row)) - 1
+                    self.conn.expire(key, PROGRESS_TTL)
+                    self._publish('row', {'index': index, 'row': row})
+                except Exception as e:
+                    logging.warning(f"Could not publish row for job {self.job.id}: {str(e)}")
+            self._save()
+
+    def update_meta(self, key, value):
+        """Set another job.meta field and save it, serialized with the progress saves."""
+        with self._lock:
+            self.job.meta[key] = value
+            self._save(force=True)
+
+    def finish(self):
+        self.set_phase("done")
+        self._publish('done', {})
+
+    def fail(self, error):
+        self._publish('failed', {'error': error})
+
+    def snapshot(self):
+        """Current progress as a JSON-friendly dict."""
+        eta = None
+        remaining = self.links_discovered - self.pages_extracted
+        if self.extract_started_at and self.pages_extracted:
+            per_page = (time.time() - self.extract_started_at) / self.pages_extracted
+            eta = round(max(remaining, 0) * per_page, 1)
+        return {
+            'phase': self.phase,
+            'links_discovered': self.links_discovered,
+            'pages_extracted': self.pages_extracted,
+            'businesses_found': self.businesses_found,
+            'phones_found': self.phones_found,
+            'elapsed_seconds': round(time.time() - self.started_at, 1),
+            'eta_seconds': eta
+        }
+
+    def _save(self, force=False):
+        now = time.time()
+        if not force and now - self._last_save < self.min_interval:
+            return
+        self._last_save = now
+        if self._pages_unrecorded:
+            incr(self.conn, 'mapphone_pages_total', {'worker': WORKER_NAME}, self._pages_unrecorded)
+            self._pages_unrecorded = 0
+        try:
+            snapshot = self.snapshot()
+            self.job.meta['progress'] = snapshot
+            if self.spans:
+                self.job.meta['performance'] = self.spans.summary()
+            self.job.save_meta()
+        except Exception as e:
+            logging.warning(f"Could not save progress for job {self.job.id}: {str(e)}")
+            return
+        self._publish('progress', snapshot)
+
+    def _publish(self, event, data):
+        try:
+            self.conn.publish(events_channel(self.job.id), json.dumps({'event': event, 'data': data}))
+        except Exception as e:
+            logging.warning(f"Could not publish {event} event for job {self.job.id}: {str(e)}")
@@ -0,0 +1,74 @@
+import os
+import gzip
+import json
+import hashlib
+from progress import business_row
+
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+
+
+def result_key(job_id):
+    """Redis hash holding a finished job's serialized response: etag, count and gzip body."""
+    return f"job:{job_id}:result"
+
+
+def result_rows_key(job_id):
+    """Redis list of a finished job's rows as JSON strings, in result order, for paging."""
+    return f"job:{job_id}:result_rows"
+
+
+def download_links(job_id):
+    return {
+        'websites_csv': f'/download/{job_id}/websites.csv',
+        'phones_csv': f'/download/{job_id}/phones.csv'
+    }
+
+
+def _splice(head, rows):
+    """Build a JSON object from the `head` dict plus a "result" array of already-encoded rows."""
+    return json.dumps(head)[:-1].encode('utf-8') + b', "result": [' + b', '.join(rows) + b']}'
+
+
+def store_result(conn, job_id, businesses, performance=None):
+    """Serialize a finished job's result once so status requests never unpickle or re-encode it.
+
+    `performance` (a SpanRecorder summary) is included in the full response when given.
+    """
+    rows = [json.dumps(business_row(business)).encode('utf-8') for business in businesses or []]
+    head = dict(status='complete', **download_links(job_id))
+    if performance:
+        head['performance'] = performance
+    body = _splice(head, rows)
+    cached = {
+        'etag': hashlib.sha1(body).hexdigest(),
+        'count': len(rows),
+        'gzip': gzip.compress(body)
+    }
+    pipe = conn.pipeline()
+    pipe.delete(result_rows_key(job_id))
+    if rows:
+        pipe.rpush(result_rows_key(job_id), *rows)
+        pipe.expire(result_rows_key(job_id), RESULT_CACHE_TTL)
+    pipe.hset(result_key(job_id), mapping=cached)
+    pipe.expire(result_key(job_id), RESULT_CACHE_TTL)
+    pipe.execute()
+    return cached
+
+
+def load_result(conn, job_id):
+    """The cached serialization written by store_result, or None."""
+    raw = conn.hgetall(result_key(job_id))
+    if not raw:
+        return None
+    return {
+        'etag': raw[b'etag'].decode(),
+        'count': int(raw[b'count']),
+        'gzip': raw[b'gzip']
+    }
+
+
+def result_page(conn, job_id, offset, limit, total):
+    """JSON body for rows [offset, offset + limit) of a finished job, spliced from the cached rows."""
+    rows = conn.lrange(result_rows_key(job_id), offset, offset + limit - 1) if limit else []
+    head = dict(status='complete', offset=offset, limit=limit, total=total, **download_links(job_id))
+    return _splice(head, rows)
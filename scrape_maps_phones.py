@@ -2,8 +2,10 @@ import time
 import csv
 import re
 import os
+import json
 import logging
-import random
+import queue
+import threading
 from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -13,8 +15,13 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, retry_if_exception_type
+from driver_resolver import get_chromedriver_path
+from throttle import shared_throttle, wait_adaptive
+from dedup import BusinessSet
+from spans import SpanRecorder, count_attempt
+
+MAPS_URL = "https://www.google.com/maps"
 
 # Configure logging to file and console
 logging.basicConfig(
@@ -26,8 +33,58 @@ logging.basicConfig(
     ]
 )
 
+# URL patterns (Network.setBlockedURLs syntax) for each resource category we can skip.
+# We only read a few DOM attributes, so none of these change what gets extracted.
+BLOCK_PATTERNS = {
+    "images": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.ico*",
+               "*googleusercontent.com/*", "*streetviewpixels-pa.googleapis.com/*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*", "*fonts.gstatic.com/*", "*fonts.googleapis.com/*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "tiles": ["*/maps/vt?*", "*/maps/vt/*", "*/kh/v=*", "*khms*.google.com/*", "*/maps/rt/*"]
+}
+
+# Keeps the WebGL map from drawing at all; the side panel we read is ordinary DOM.
+HIDE_MAP_SCRIPT = """
+document.addEventListener("DOMContentLoaded", function () {
+    var style = document.createElement("style");
+    style.textContent = "canvas, #scene { display: none !important; }";
+    document.head.appendChild(style);
+});
+"""
+
+def resource_blocking_options(headless):
+    """Blocked resource categories (BLOCK_RESOURCES) and whether to hide the map (HIDE_MAP_CANVAS).
+
+    Both default to on for headless browsers and off for visible ones. BLOCK_RESOURCES is a
+    comma-separated subset of BLOCK_PATTERNS, "all" or "none".
+    """
+    blocked = os.getenv("BLOCK_RESOURCES", "all" if headless else "none").lower()
+    if blocked == "all":
+        categories = list(BLOCK_PATTERNS)
+    else:
+        categories = [c.strip() for c in blocked.split(",") if c.strip() in BLOCK_PATTERNS]
+    hide_map = os.getenv("HIDE_MAP_CANVAS", str(headless)).lower() == "true"
+    return categories, hide_map
+
+def apply_resource_blocking(driver, categories, hide_map=False):
+    """Install the request blocklist and map-hiding script on a driver through CDP."""
+    patterns = [pattern for category in categories for pattern in BLOCK_PATTERNS[category]]
+    try:
+        if patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        if hide_map:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": HIDE_MAP_SCRIPT})
+        if patterns or hide_map:
+            logging.info(f"Blocking {', '.join(categories) or 'no resources'}; map canvas hidden: {hide_map}.")
+    except Exception as e:
+        logging.warning(f"Could not set up resource blocking: {str(e)}")
+
 def setup_driver():
-    """Set up Chrome driver, headless for production, visible for local."""
+    """Set up Chrome driver, headless for production, visible for local.
+
+    Images, fonts, media and map tiles are blocked according to resource_blocking_options().
+    """
     logging.info("Initializing Chrome browser...")
     chrome_options = Options()
     chrome_options.add_argument("--disable-gpu")
@@ -39,11 +96,19 @@ def setup_driver():
     if is_headless:
         logging.info("Running in headless mode for production.")
         chrome_options.add_argument("--headless=new")
+    blocked, hide_map = resource_blocking_options(is_headless)
+    if "images" in blocked:
+        # Also stops images from being decoded when they come from an unlisted host.
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
     
     try:
-        service = Service(ChromeDriverManager().install())
+        driver_path = get_chromedriver_path()
+        if not driver_path:
+            raise RuntimeError("chromedriver binary could not be resolved")
+        service = Service(driver_path)
         logging.info("Starting ChromeDriver...")
         driver = webdriver.Chrome(service=service, options=chrome_options)
+        apply_resource_blocking(driver, blocked, hide_map)
         if not is_headless:
             driver.maximize_window()
         logging.info("Chrome browser initialized successfully.")
@@ -68,227 +133,766 @@ def clean_phone(phone):
         return phone
     return ""
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_fixed(2),
-    retry=retry_if_exception_type((TimeoutException, StaleElementReferenceException))
-)
-def scroll_and_paginate(driver, scroll_pane_selector, max_time=300):
-    """Scroll and paginate Google Maps results until no more pages."""
-    logging.info("Scrolling and paginating Google Maps results...")
+def feed_size(driver, scroll_pane_selector):
+    """Number of entries currently rendered in the results feed."""
+    return driver.execute_script(
+        "var feed = document.querySelector(arguments[0]); return feed ? feed.children.length : 0;",
+        scroll_pane_selector
+    )
+
+def wait_for_feed_growth(driver, scroll_pane_selector, previous_size, timeout=None):
+    """Wait until the feed holds more than previous_size entries. Returns the new size, or previous_size on timeout."""
+    timeout = timeout or float(os.getenv("SCROLL_WAIT_TIMEOUT", "5"))
+
+    def grown(d):
+        size = feed_size(d, scroll_pane_selector)
+        return size if size > previous_size else False
+
     try:
-        start_time = time.time()
-        while time.time() - start_time < max_time:
-            try:
-                scroll_pane = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, scroll_pane_selector))
-                )
-                driver.execute_script("arguments[0].scrollTo(0, arguments[0].scrollHeight);", scroll_pane)
-                time.sleep(random.uniform(1, 3))  # Random delay
-            except TimeoutException:
-                logging.warning("Timeout scrolling results pane.")
-            
-            try:
-                next_button = driver.find_element(By.CSS_SELECTOR, "button[aria-label*='Next']")
-                if next_button.get_attribute("disabled"):
-                    logging.info("No more pages to load.")
-                    return True
-                logging.info("Clicking 'Next' to load more results...")
-                next_button.click()
-                WebDriverWait(driver, 5).until(EC.staleness_of(next_button))
-                time.sleep(random.uniform(1, 3))
-            except NoSuchElementException:
-                logging.info("No 'Next' button found. End of results.")
-                return True
-            except TimeoutException:
-                logging.warning("Timeout loading next page.")
-        logging.info("Max pagination time reached.")
-        return False
-    except Exception as e:
-        logging.error(f"Error scrolling/paginating: {str(e)}")
+        return WebDriverWait(driver, timeout, poll_frequency=0.25).until(grown)
+    except TimeoutException:
+        return previous_size
+
+FEED_END_SCRIPT = """
+var feed = document.querySelector(arguments[0]);
+if (!feed) { return false; }
+return !!feed.querySelector("span.HlvSq") || /reached the end of the list/i.test(feed.innerText.slice(-300));
+"""
+
+def feed_end_reached(driver, scroll_pane_selector):
+    """Whether Maps is showing its "You've reached the end of the list" marker."""
+    try:
+        return bool(driver.execute_script(FEED_END_SCRIPT, scroll_pane_selector))
+    except Exception:
         return False
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_fixed(2),
-    retry=retry_if_exception_type(TimeoutException)
-)
-def get_business_links(driver, results_selector):
-    """Extract links to business details pages."""
-    logging.info("Extracting business detail page links...")
+# Collects every matching place link in one round trip, canonicalized to origin + path (the
+# place IDs live in the path; the query only carries tracking like authuser, hl and rclk)
+# and deduplicated in document order.
+PLACE_LINKS_SCRIPT = """
+var seen = {};
+var links = [];
+document.querySelectorAll(arguments[0]).forEach(function (a) {
+    if (!a.href || a.pathname.indexOf("/maps/place/") === -1) { return; }
+    var href = a.origin + a.pathname;
+    if (!seen[href]) {
+        seen[href] = true;
+        links.push(href);
+    }
+});
+return links;
+"""
+
+def collect_place_links(driver, results_selector):
+    """Canonical, deduplicated place URLs of every element matching results_selector."""
+    return driver.execute_script(PLACE_LINKS_SCRIPT, results_selector) or []
+
+# Google puts a consent interstitial (consent.google.com) or a rate-limit CAPTCHA (/sorry/)
+# in front of the page it was asked for; either one means we are going too fast.
+PAGE_SIGNAL_SCRIPT = """
+if (/\\/sorry\\//.test(location.pathname) ||
+        document.querySelector("#captcha-form, iframe[src*='recaptcha']")) { return "captcha"; }
+if (/^consent\\./.test(location.hostname) || document.querySelector("form[action*='consent.google']")) {
+    return "consent";
+}
+return "";
+"""
+
+def page_signal(driver):
+    """"captcha" or "consent" if Google is showing an interstitial instead of the page, else ""."""
     try:
-        results = WebDriverWait(driver, 5).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, results_selector))
-        )
-        links = []
-        for result in results:
-            try:
-                link = result.get_attribute("href")
-                if link and "https://www.google.com/maps/place/" in link:
-                    links.append(link)
-            except StaleElementReferenceException:
-                continue
-        logging.info(f"Found {len(links)} business links.")
-        return links
-    except TimeoutException:
-        logging.warning("Timeout while loading business results.")
-        return []
-    except Exception as e:
-        logging.error(f"Error extracting business links: {str(e)}")
-        return []
+        return driver.execute_script(PAGE_SIGNAL_SCRIPT) or ""
+    except Exception:
+        return ""
+
+class FeedHarvester:
+    """Scroll and paginate the results feed, yielding place URLs as soon as they are rendered.
+
+    Iterating drives the search driver one scroll step at a time, so extraction can start
+    on other drivers while scrolling continues. Afterwards `links` holds every URL seen,
+    in feed order, `completed` says whether the end of the results was reached and
+    `stop_reason` says why scrolling stopped: "end_of_list" (Maps' end marker), "saturated"
+    (no growth for SCROLL_SATURATION_STEPS steps), "last_page", "max_time" or "error".
+    `on_step()` is called whenever the feed is read for new links: once per scroll step
+    and per results page, before the next scroll or Next click can replace what is rendered.
+    """
+
+    def __init__(self, driver, scroll_pane_selector, results_selector, max_time=300, rate_limiter=None,
+                 maps_url=MAPS_URL, spans=None, on_step=None):
+        self.driver = driver
+        self.maps_url = maps_url
+        self.spans = spans or SpanRecorder()
+        self.scroll_pane_selector = scroll_pane_selector
+        self.results_selector = results_selector
+        self.on_step = on_step
+        self.max_time = max_time
+        self.rate_limiter = rate_limiter or shared_throttle()
+        self.saturation_steps = int(os.getenv("SCROLL_SATURATION_STEPS", "3"))
+        self.links = []
+        self.completed = False
+        self.stop_reason = None
+        self._seen = set()
+
+    def _new_links(self):
+        """Place URLs rendered since the last call."""
+        if self.on_step:
+            self.on_step()
+        fresh = [link for link in collect_place_links(self.driver, self.results_selector) if link not in self._seen]
+        self._seen.update(fresh)
+        self.links.extend(fresh)
+        return fresh
+
+    def _stop(self, reason, message):
+        logging.info(message)
+        self.stop_reason = reason
+        self.completed = reason in ("end_of_list", "saturated", "last_page")
+
+    def __iter__(self):
+        logging.info("Scrolling and paginating Google Maps results...")
+        driver = self.driver
+        domain = urlparse(self.maps_url).netloc
+        stalled_steps = 0
+        try:
+            start_time = time.time()
+            yield from self._new_links()
+            while time.time() - start_time < self.max_time:
+                # Pacing happens outside the spans, which time only the browser's work.
+                self.rate_limiter.wait(domain)
+                with self.spans.span("scroll_step") as span:
+                    try:
+                        scroll_pane = WebDriverWait(driver, 5).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, self.scroll_pane_selector))
+                        )
+                        size = feed_size(driver, self.scroll_pane_selector)
+                        driver.execute_script("arguments[0].scrollTo(0, arguments[0].scrollHeight);", scroll_pane)
+                        if wait_for_feed_growth(driver, self.scroll_pane_selector, size) > size:
+                            stalled_steps = 0
+                        else:
+                            stalled_steps += 1
+                            span["outcome"] = "stalled"
+                        self.rate_limiter.record(self.maps_url, "ok")
+                    except TimeoutException:
+                        logging.warning("Timeout scrolling results pane.")
+                        span["outcome"] = page_signal(driver) or "timeout"
+                        self.rate_limiter.record(self.maps_url, span["outcome"])
+                        stalled_steps += 1
+                yield from self._new_links()
+                
+                if feed_end_reached(driver, self.scroll_pane_selector):
+                    self._stop("end_of_list", "Reached the end of the results list.")
+                    return
+                
+                try:
+                    next_button = driver.find_element(By.CSS_SELECTOR, "button[aria-label*='Next']")
+                    if next_button.get_attribute("disabled"):
+                        self._stop("last_page", "No more pages to load.")
+                        return
+                    logging.info("Clicking 'Next' to load more results...")
+                    self.rate_limiter.wait(domain)
+                    with self.spans.span("next_page"):
+                        next_button.click()
+                        WebDriverWait(driver, 5).until(EC.staleness_of(next_button))
+                        WebDriverWait(driver, 5).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, self.scroll_pane_selector))
+                        )
+                    stalled_steps = 0
+                    yield from self._new_links()
+                    continue
+                except NoSuchElementException:
+                    pass
+                except TimeoutException:
+                    logging.warning("Timeout loading next page.")
+                    self.rate_limiter.record(self.maps_url, page_signal(driver) or "timeout")
+                
+                if stalled_steps >= self.saturation_steps:
+                    self._stop("saturated", f"Results feed stopped growing for {stalled_steps} steps.")
+                    return
+            self._stop("max_time", "Max pagination time reached.")
+        except Exception as e:
+            logging.error(f"Error scrolling/paginating: {str(e)}")
+            self.stop_reason = "error"
+        finally:
+            logging.info(f"Harvested {len(self.links)} business links; stopped because: {self.stop_reason}.")
+
+# Where each place-page field lives, as (CSS selector, attribute) rules tried in order; the
+# attribute "text" means the element's visible text, as Selenium's element.text returns it.
+# Bump the version whenever Maps changes its markup and the rules are updated.
+# PLACE_SELECTORS_FILE can point at a JSON file with the same shape to hot-fix selectors
+# without a deploy.
+PLACE_SELECTORS = {
+    "version": 1,
+    "fields": {
+        "name": [["h1", "text"]],
+        "website": [["a[data-item-id*='authority']", "href"]],
+        "phone": [["button[data-item-id*='phone']", "aria-label"]],
+        "address": [["button[data-item-id='address']", "aria-label"]],
+        "rating": [["div.F7nice span[aria-hidden='true']", "text"], ["span.ceNzKf", "aria-label"]],
+        "category": [["button[jsaction*='category']", "text"], ["button.DkEaL", "text"]]
+    }
+}
+
+def _check_place_selectors(table):
+    """Raise ValueError unless table has a version and maps each field to a list of [selector, attribute] rules."""
+    if not isinstance(table, dict) or "version" not in table:
+        raise ValueError("missing \"version\"")
+    fields = table.get("fields")
+    if not isinstance(fields, dict) or not fields:
+        raise ValueError("\"fields\" must map field names to rule lists")
+    for field, rules in fields.items():
+        if not isinstance(rules, list) or not all(
+                isinstance(rule, list) and len(rule) == 2 and all(isinstance(part, str) for part in rule)
+                for rule in rules):
+            raise ValueError(f"rules for {field!r} must be a list of [selector, attribute] pairs")
+
+def load_place_selectors():
+    """The selector table from PLACE_SELECTORS_FILE if set, readable and well-formed, else PLACE_SELECTORS."""
+    path = os.getenv("PLACE_SELECTORS_FILE")
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                table = json.load(f)
+            _check_place_selectors(table)
+            logging.info(f"Using place selectors version {table['version']} from {path}.")
+            return table
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load place selectors from {path}: {str(e)}")
+    return PLACE_SELECTORS
+
+# Reads every field of a place page in one round trip, taking the first rule that yields a value.
+PLACE_DETAILS_SCRIPT = """
+var fields = arguments[0];
+var details = {};
+Object.keys(fields).forEach(function (field) {
+    details[field] = "";
+    fields[field].some(function (rule) {
+        var element = document.querySelector(rule[0]);
+        if (!element) { return false; }
+        var value = rule[1] === "text" ? element.innerText :
+            rule[1] === "href" ? element.href : element.getAttribute(rule[1]);
+        value = (value || "").trim();
+        details[field] = value;
+        return !!value;
+    });
+});
+return details;
+"""
+
+def _strip_label(value):
+    """Drop the "Phone: " / "Address: " prefix Maps puts in aria-labels."""
+    return re.sub(r"^[^:\d]{1,20}:\s*", "", value or "").strip()
 
 @retry(
     stop=stop_after_attempt(3),
-    wait=wait_fixed(2),
-    retry=retry_if_exception_type((TimeoutException, StaleElementReferenceException))
+    wait=wait_adaptive,
+    retry=retry_if_exception_type((TimeoutException, StaleElementReferenceException)),
+    reraise=True
 )
-def extract_business_info(driver, url):
-    """Extract business name, website URL, and phone number from a business details page."""
-    logging.info(f"Visiting business page: {url}")
+def _read_place_page(driver, url, fields):
+    """Load a place page and read its raw fields. Timeouts are retried with the throttle's backoff.
+
+    Returns {} without retrying when Google shows a CAPTCHA or consent page instead.
+    """
+    count_attempt()
+    driver.get(url)
     try:
-        driver.get(url)
         WebDriverWait(driver, 5).until(
             EC.presence_of_element_located((By.TAG_NAME, "h1"))
         )
-        
-        business_name = ""
-        try:
-            name_element = driver.find_element(By.TAG_NAME, "h1")
-            business_name = name_element.text.strip()
-            logging.info(f"Business name: {business_name}")
-        except NoSuchElementException:
-            logging.warning("No business name found.")
-        
-        website = ""
-        try:
-            website_element = driver.find_element(By.CSS_SELECTOR, "a[data-item-id*='authority']")
-            website = clean_url(website_element.get_attribute("href"))
-            logging.info(f"Found website: {website}")
-        except NoSuchElementException:
-            logging.info("No website link found.")
-        
-        phone = ""
-        try:
-            phone_element = driver.find_element(By.CSS_SELECTOR, "button[data-item-id*='phone']")
-            phone = clean_phone(phone_element.get_attribute("aria-label").replace("Phone:", "").strip())
-            logging.info(f"Found phone: {phone}")
-        except NoSuchElementException:
-            logging.info("No phone number found.")
-        
-        time.sleep(random.uniform(1, 2))  # Random delay
-        return business_name, website, phone
     except TimeoutException:
+        if page_signal(driver):
+            # Reloading straight into an interstitial only makes the block worse.
+            return {}
+        raise
+    return driver.execute_script(PLACE_DETAILS_SCRIPT, fields) or {}
+
+def extract_place_details(driver, url, selectors=None):
+    """Read name, website, phone, address, rating and category from a business details page.
+
+    Returns a dict with every field of the selector table (empty strings when missing); all
+    fields are read by a single execute_script call once the page's h1 has rendered.
+    """
+    logging.info(f"Visiting business page: {url}")
+    selectors = selectors or PLACE_SELECTORS
+    empty = dict.fromkeys(selectors["fields"], "")
+    try:
+        details = dict(empty, **_read_place_page(driver, url, selectors["fields"]))
+        details["website"] = clean_url(details.get("website"))
+        details["phone"] = clean_phone(_strip_label(details.get("phone")))
+        details["address"] = _strip_label(details.get("address"))
+        rating = re.search(r"\d+(?:[.,]\d+)?", details.get("rating") or "")
+        details["rating"] = rating.group(0).replace(",", ".") if rating else ""
+        logging.info(f"Business: {details.get('name') or 'no name'}; website: {details['website'] or 'none'}; "
+                     f"phone: {details['phone'] or 'none'}")
+        return details
+    except (TimeoutException, StaleElementReferenceException):
         logging.warning(f"Timeout loading business page: {url}.")
-        return "", "", ""
+        return empty
     except Exception as e:
         logging.error(f"Error processing business page {url}: {str(e)}")
-        return "", "", ""
+        return empty
 
-def save_to_csv(businesses, filename="phones.csv"):
-    """Save business names, websites, and phone numbers to a CSV file."""
-    logging.info(f"Saving {len(businesses)} businesses to {filename}...")
+def extract_business_info(driver, url, selectors=None):
+    """Extract business name, website URL, and phone number from a business details page."""
+    details = extract_place_details(driver, url, selectors)
+    return details.get("name", ""), details.get("website", ""), details.get("phone", "")
+
+# Reads every place card in the results feed in one round trip. The card is the feed child
+# that contains the place link; Maps puts the name in the link's aria-label.
+FEED_CARDS_SCRIPT = """
+var feed = document.querySelector(arguments[0]);
+if (!feed) { return []; }
+var seen = {};
+var cards = [];
+feed.querySelectorAll("a[href*='/maps/place/']").forEach(function (link) {
+    var url = link.origin + link.pathname;
+    if (seen[url]) { return; }
+    seen[url] = true;
+    var card = link;
+    while (card.parentElement && card.parentElement !== feed) { card = card.parentElement; }
+    var name = link.getAttribute("aria-label") || "";
+    var website = "";
+    card.querySelectorAll("a[href^='http']").forEach(function (a) {
+        if (!website && !/(^|\\.)google\\./.test(a.hostname)) { website = a.href; }
+    });
+    var phone = "";
+    var phoneSpan = card.querySelector(".UsdlK");
+    if (phoneSpan) {
+        phone = phoneSpan.textContent;
+    } else {
+        var match = (card.innerText || "").match(/\\+?\\d[\\d\\s().-]{6,}\\d/);
+        if (match) { phone = match[0]; }
+    }
+    cards.push({url: url, name: name, website: website, phone: phone});
+});
+return cards;
+"""
+
+def extract_feed_cards(driver, scroll_pane_selector):
+    """Read (url, name, website, phone) for every card in the results feed with a single script call."""
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Business Name', 'Website', 'Phone'])
-            for name, website, phone in businesses:
-                writer.writerow([name, website or 'N/A', phone or 'N/A'])
-        logging.info(f"Businesses successfully saved to {filename}.")
+        cards = driver.execute_script(FEED_CARDS_SCRIPT, scroll_pane_selector) or []
     except Exception as e:
-        logging.error(f"Error saving to CSV: {str(e)}")
+        logging.error(f"Error reading results feed: {str(e)}")
+        return []
+    logging.debug(f"Read {len(cards)} cards from the results feed.")
+    return [
+        (card["url"], (card["name"].strip(), clean_url(card["website"]), clean_phone(card["phone"])))
+        for card in cards
+    ]
+
+def extract_businesses(links, drivers, max_time=None, start_time=None, rate_limiter=None, cache=None,
+                       on_result=None, spans=None):
+    """Visit business pages with one worker thread per driver and return (link, info) pairs in link order.
+
+    The first driver is worked by the calling thread once every link has been queued,
+    so `links` may be a generator that still needs that driver. Links found in `cache`
+    (a PlaceCache) are answered without a page visit. `on_result(link, info)` is called
+    from the worker threads as soon as each page is done. Cache lookups and page visits are
+    timed as "cache_lookup" and "detail_page" spans on `spans`.
+    """
+    start_time = start_time or time.time()
+    rate_limiter = rate_limiter or shared_throttle()
+    spans = spans or SpanRecorder()
+    selectors = load_place_selectors()
+    work = queue.Queue()
+    results = {}
+    out_of_time = threading.Event()
+    abandoned = threading.Event()
+
+    def consume(index, driver):
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            if abandoned.is_set():
+                continue
+            i, link = item
+            cached = None
+            if cache:
+                with spans.span("cache_lookup") as span:
+                    cached = cache.get(link)
+                    span["outcome"] = "hit" if cached else "miss"
+            if cached:
+                results[i] = (link, cached)
+                if on_result:
+                    on_result(link, cached)
+                continue
+            if max_time and time.time() - start_time > max_time:
+                if not out_of_time.is_set():
+                    out_of_time.set()
+                    logging.info(f"Stopping scrape: Time limit reached after {len(results)} businesses.")
+                continue
+            logging.info(f"Processing business {i + 1}...")
+            # The span opens once the slot is held, so time spent queuing for it is not counted.
+            with rate_limiter.slot(link), spans.span("detail_page", url=link) as span:
+                began = time.time()
+                info = extract_business_info(driver, link, selectors)
+                # A page without even a name timed out or was replaced by an interstitial.
+                span["outcome"] = "ok" if any(info) else page_signal(driver) or "timeout"
+                rate_limiter.record(link, span["outcome"], time.time() - began, worker=index)
+            results[i] = (link, info)
+            if cache:
+                cache.set(link, results[i][1])
+            if on_result:
+                on_result(link, results[i][1])
 
-def save_websites_to_csv(businesses, filename="websites.csv"):
-    """Save business names and website URLs to a CSV file."""
-    logging.info(f"Saving {len(businesses)} businesses to {filename}...")
+    workers = [threading.Thread(target=consume, args=(i, d), daemon=True) for i, d in enumerate(drivers[1:], 1)]
+    for worker in workers:
+        worker.start()
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Business Name', 'Website'])
-            for name, website, _ in businesses:
-                if website:
-                    writer.writerow([name, website])
-        logging.info(f"Websites successfully saved to {filename}.")
-    except Exception as e:
-        logging.error(f"Error saving to CSV: {str(e)}")
+        try:
+            for item in enumerate(links):
+                work.put(item)
+        finally:
+            for _ in drivers:
+                work.put(None)
+        consume(0, drivers[0])
+    except BaseException:
+        # Let the other threads drain the queue without visiting pages.
+        abandoned.set()
+        raise
+    finally:
+        # The caller hands the drivers back afterwards, so no thread may still be using one.
+        for worker in workers:
+            worker.join()
+    return [results[i] for i in sorted(results)]
+
+def _borrow_drivers(pool, count):
+    """Get up to `count` extra drivers for concurrent extraction, from the pool if there is one."""
+    drivers = []
+    for _ in range(count):
+        driver = pool.acquire(timeout=5) if pool else setup_driver()
+        if not driver:
+            break
+        drivers.append(driver)
+    if len(drivers) < count:
+        logging.warning(f"Only {len(drivers)} of {count} extra browsers available for extraction.")
+    return drivers
+
+def _return_drivers(pool, drivers):
+    for driver in drivers:
+        if pool:
+            pool.release(driver)
+        else:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+class CsvSink:
+    """Write businesses to phones.csv and websites.csv as they are extracted.
+
+    Rows are deduplicated on the fly (by a dedup.BusinessSet, so formatting differences in
+    names or phone numbers don't create duplicates) and flushed to `<name>.part` files straight away,
+    so a killed job still leaves its partial results on disk; close() renames the
+    .part files into place. Safe to call add() from several extraction threads.
+    """
+
+    def __init__(self, output_dir=""):
+        self.paths = {name: os.path.join(output_dir, name) for name in ("phones.csv", "websites.csv")}
+        self.count = 0
+        self._seen = BusinessSet()
+        self._lock = threading.Lock()
+        self._files = {name: open(f"{path}.part", "w", newline="", encoding="utf-8") for name, path in self.paths.items()}
+        self._writers = {name: csv.writer(f) for name, f in self._files.items()}
+        self._writers["phones.csv"].writerow(['Business Name', 'Website', 'Phone'])
+        self._writers["websites.csv"].writerow(['Business Name', 'Website'])
+        self._flush()
+
+    def add(self, business, url=None):
+        """Append one (name, website, phone) from place `url` unless it was already written. Returns True if it was new."""
+        name, website, phone = business
+        if not (name or website or phone):
+            return False
+        with self._lock:
+            if not self._seen.add(business, url):
+                return False
+            self._writers["phones.csv"].writerow([name, website or 'N/A', phone or 'N/A'])
+            if website:
+                self._writers["websites.csv"].writerow([name, website])
+            self.count += 1
+            self._flush()
+        return True
+
+    def _flush(self):
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        """Finalize the CSVs by renaming the .part files into place."""
+        with self._lock:
+            if not self._files:
+                return
+            for name, f in self._files.items():
+                os.fsync(f.fileno())
+                f.close()
+                os.replace(f"{self.paths[name]}.part", self.paths[name])
+            self._files = {}
+        logging.info(f"Saved {self.count} businesses to {', '.join(self.paths.values())}.")
+
+    def __enter__(self):
+        return self
 
-def scrape_google_maps(search_term, max_time=600):
-    """Scrape business names, website URLs, and phone numbers from Google Maps."""
-    driver = setup_driver()
+    def __exit__(self, *exc_info):
+        self.close()
+
+FEED_FIELDS = ("name", "website", "phone")
+
+def _feed_required_fields():
+    """Indexes into FEED_FIELDS of the comma-separated FEED_REQUIRED_FIELDS (default name,phone)."""
+    names = [f.strip() for f in os.getenv("FEED_REQUIRED_FIELDS", "name,phone").split(",") if f.strip()]
+    unknown = [f for f in names if f not in FEED_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"FEED_REQUIRED_FIELDS must list some of {', '.join(FEED_FIELDS)}; "
+                         f"got {os.getenv('FEED_REQUIRED_FIELDS')!r}")
+    return [FEED_FIELDS.index(f) for f in names]
+
+# Checked at import so a typo stops the worker instead of turning every feed scrape into an empty one.
+FEED_REQUIRED_FIELDS = _feed_required_fields()
+
+def scrape_google_maps(search_term, max_time=600, driver=None, pool=None, concurrency=None, mode=None, cache=None,
+                       sink=None, progress=None, checkpoint=None, base_url=None, spans=None, rate_limiter=None):
+    """Scrape business names, website URLs, and phone numbers from Google Maps.
+
+    If a driver is passed in (e.g. from a DriverPool) the caller owns it and it is left running.
+    Detail pages are fetched by `concurrency` browsers at once (EXTRACT_CONCURRENCY, default 1);
+    the extra browsers come from `pool` when given.
+    In "feed" mode (EXTRACT_MODE=feed) details are read from the results feed and only cards
+    missing one of FEED_REQUIRED_FIELDS (default name,phone) get a detail-page visit.
+    Pass a PlaceCache or DedupIndex as `cache` to skip pages scraped by earlier jobs, and a CsvSink as `sink`
+    to have each business written out as soon as it is extracted. `progress` (e.g. a JobProgress)
+    is told about the current phase, every discovered link and every extracted page.
+    With a Checkpoint, harvested links and extracted pages are saved as they come in, and a
+    checkpoint left by an earlier, unfinished scrape of the term is resumed: finished pages
+    are not visited again and, if the frontier was complete, the search is skipped entirely.
+    Pages that came back empty (timed out or blocked) are not marked finished. A blocked
+    search returns what was found so far; other errors are raised after the checkpoint is
+    flushed, so a retried job picks up from it.
+    `base_url` (or MAPS_BASE_URL) points the scrape at another Maps site, such as fake_maps.py.
+    Requests are paced by `rate_limiter`, by default the process-wide AdaptiveThrottle.
+    Driver setup, navigation, search, scroll steps, detail pages and CSV writes are timed as
+    spans on `spans` (a SpanRecorder), whose summary is logged at the end.
+    """
+    maps_url = base_url or os.getenv("MAPS_BASE_URL") or MAPS_URL
+    concurrency = concurrency or int(os.getenv("EXTRACT_CONCURRENCY", "1"))
+    mode = mode or os.getenv("EXTRACT_MODE", "detail")
+    spans = spans or SpanRecorder()
+    owns_driver = driver is None
+    if owns_driver:
+        with spans.span("driver_setup") as span:
+            driver = setup_driver()
+            span["outcome"] = "ok" if driver else "failed"
     if not driver:
         logging.error("Failed to initialize driver. Aborting scrape.")
         return []
 
     start_time = time.time()
-    businesses = set()
+    rate_limiter = rate_limiter or shared_throttle()
+    harvester = None
+    cards = {}
+    found = {}
+    resumed = checkpoint.load() if checkpoint else False
+    frontier = list(checkpoint.frontier) if resumed else []
+    order = list(frontier)
+    complete = False
+
+    def set_phase(phase):
+        if progress:
+            progress.set_phase(phase)
+
+    def record(url, info):
+        if sink:
+            with spans.span("export"):
+                added = sink.add(info, url)
+        else:
+            added = any(info)
+        if progress:
+            progress.page_done(info, added)
+
+    def announce(links):
+        # Links saved by an earlier attempt go first; the harvester's repeats of them are skipped.
+        for link in frontier:
+            if link not in found:
+                yield link
+        seen = set(frontier)
+        for link in links:
+            if link in seen:
+                continue
+            seen.add(link)
+            order.append(link)
+            if checkpoint:
+                checkpoint.add_link(link)
+            if progress:
+                progress.link_discovered()
+            yield link
+        if checkpoint and harvester.completed:
+            checkpoint.set_harvested()
+        set_phase("extracting")
+
+    if resumed:
+        logging.info(f"Resuming from checkpoint: {len(checkpoint.done)} of {len(frontier)} links already done.")
+        found.update(checkpoint.done)
+        if progress:
+            progress.link_discovered(len(frontier))
+        for url, info in found.items():
+            record(url, info)
+
     try:
-        logging.info("Navigating to Google Maps...")
-        driver.get("https://www.google.com/maps")
-        time.sleep(random.uniform(2, 4))
-        try:
-            search_box = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "searchboxinput"))
-            )
-            logging.info(f"Searching for: {search_term}")
-            search_box.send_keys(search_term)
-            search_box.send_keys(Keys.ENTER)
-            time.sleep(random.uniform(2, 4))
-        except TimeoutException:
-            logging.error("Timeout waiting for search box. Possible CAPTCHA or network issue.")
-            driver.quit()
-            return []
-        
-        scroll_pane_selector = "div[role='feed']"
-        results_selector = "a[href*='/maps/place/']"
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, scroll_pane_selector))
-        )
-        
-        if not scroll_and_paginate(driver, scroll_pane_selector, max_time):
-            logging.warning("Pagination incomplete due to timeout or error.")
+        if resumed and checkpoint.harvested:
+            logging.info("Checkpointed link frontier is complete; skipping the search.")
+            set_phase("extracting")
+            business_links = [url for url in frontier if url not in found]
+        else:
+            set_phase("searching")
+            logging.info("Navigating to Google Maps...")
+            with rate_limiter.slot(maps_url), spans.span("navigate"):
+                driver.get(maps_url)
+            with spans.span("search") as span:
+                try:
+                    search_box = WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.ID, "searchboxinput"))
+                    )
+                    logging.info(f"Searching for: {search_term}")
+                    search_box.send_keys(search_term)
+                    search_box.send_keys(Keys.ENTER)
+                except TimeoutException:
+                    span["outcome"] = page_signal(driver) or "timeout"
+                    rate_limiter.record(maps_url, span["outcome"])
+                    if span["outcome"] != "timeout":
+                        logging.error(f"Search blocked by a {span['outcome']} page.")
+                    else:
+                        logging.error("Timeout waiting for search box. Possible CAPTCHA or network issue.")
+                    return []
+
+                scroll_pane_selector = "div[role='feed']"
+                results_selector = "a[href*='/maps/place/']"
+                try:
+                    WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, scroll_pane_selector))
+                    )
+                except TimeoutException:
+                    # Blocked, or Maps jumped straight to a single place: either way there is no feed.
+                    span["outcome"] = page_signal(driver) or "no_feed"
+                    if span["outcome"] != "no_feed":
+                        rate_limiter.record(maps_url, span["outcome"])
+                    logging.error(f"No results feed for '{search_term}' ({span['outcome']}).")
+                    return []
+
+            def read_cards():
+                # Paged results replace the feed and a scrolled feed drops cards that left the
+                # viewport, so cards are read on every harvester step and merged by URL.
+                with spans.span("feed_cards"):
+                    for url, info in extract_feed_cards(driver, scroll_pane_selector):
+                        cards[url] = tuple(old or new for old, new in zip(cards.get(url, ("", "", "")), info))
+
+            set_phase("harvesting")
+            harvester = FeedHarvester(driver, scroll_pane_selector, results_selector, max_time, rate_limiter, maps_url,
+                                      spans, on_step=read_cards if mode == "feed" else None)
+        if harvester and mode == "feed":
+            for _ in harvester:
+                pass
+            known = set(frontier)
+            new_links = [url for url in dict.fromkeys(harvester.links + list(cards)) if url not in known]
+            order.extend(new_links)
+            if progress:
+                progress.link_discovered(len(new_links))
+            complete_cards = [(url, cards[url]) for url in order if url in cards and url not in found
+                              and all(cards[url][i] for i in FEED_REQUIRED_FIELDS)]
+            found.update(complete_cards)
+            # Links without a complete card, including harvested links no card was read for, get a page visit.
+            business_links = [url for url in order if url not in found]
+            logging.info(f"Read {len(cards)} cards from the results feed; {len(complete_cards)} businesses complete, "
+                         f"{len(business_links)} need a page visit.")
+            if checkpoint:
+                for url in new_links:
+                    checkpoint.add_link(url)
+                for url, info in complete_cards:
+                    checkpoint.add_result(url, info)
+                if harvester.completed:
+                    checkpoint.set_harvested()
+            for url, info in complete_cards:
+                record(url, info)
+            set_phase("extracting")
+        elif harvester:
+            # Extraction on the extra drivers starts while the harvester is still scrolling.
+            business_links = announce(harvester)
         
-        business_links = get_business_links(driver, results_selector)
-        if not business_links:
+        partial = dict(cards)
+
+        def on_result(url, info):
+            # Keep whatever the feed card had if the detail page came back without it.
+            info = tuple(page or card for page, card in zip(info, partial.get(url, ("", "", ""))))
+            # An empty page timed out or was blocked; it stays in the frontier so a resume retries it.
+            if any(info):
+                found[url] = info
+                if checkpoint:
+                    checkpoint.add_result(url, info)
+            record(url, info)
+
+        with spans.span("borrow_drivers"):
+            extra_drivers = _borrow_drivers(pool, concurrency - 1) if mode != "feed" or len(business_links) > 1 else []
+        try:
+            extract_businesses(business_links, [driver] + extra_drivers, max_time, start_time, rate_limiter, cache,
+                               on_result, spans)
+        finally:
+            _return_drivers(pool, extra_drivers)
+        if harvester and not harvester.completed:
+            logging.warning(f"Pagination incomplete ({harvester.stop_reason}).")
+        if harvester and not harvester.links:
             logging.warning("No business links found.")
-        
-        for i, link in enumerate(business_links, 1):
-            if time.time() - start_time > max_time:
-                logging.info(f"Stopping scrape: Time limit reached after {len(businesses)} businesses.")
-                break
-            logging.info(f"Processing business {i}/{len(business_links)}...")
-            name, website, phone = extract_business_info(driver, link)
-            if name or website or phone:
-                businesses.add((name, website, phone))
+        complete = bool(checkpoint) and checkpoint.harvested and all(url in found for url in order)
         
     except KeyboardInterrupt:
-        logging.info("User interrupted scraping. Saving progress...")
-        save_to_csv(businesses)
-        save_websites_to_csv(businesses)
+        logging.info("User interrupted scraping. Progress so far has been written out.")
         raise
     except Exception as e:
+        # Fatal (a dead browser, RQ's job timeout): fail the job so its retry resumes from the checkpoint.
         logging.error(f"Error during scraping: {str(e)}")
+        raise
     finally:
-        logging.info("Closing Chrome browser...")
-        try:
-            driver.quit()
-        except:
-            pass
-    
-    businesses = list(businesses)
+        if owns_driver:
+            logging.info("Closing Chrome browser...")
+            try:
+                driver.quit()
+            except:
+                pass
+        if checkpoint:
+            checkpoint.flush()
+
+    if complete:
+        checkpoint.finish()
+    elif checkpoint:
+        logging.info(f"Checkpoint kept for '{search_term}': {len(found)} pages done so far.")
+    # Order by position in the feed so output doesn't depend on which browser finished first.
+    businesses = BusinessSet()
+    for url in order:
+        if any(found.get(url, ())):
+            businesses.add(found[url], url)
+    businesses = businesses.values()
     elapsed_time = time.time() - start_time
     logging.info(f"Scraping completed in {elapsed_time:.2f} seconds. Collected {len(businesses)} businesses.")
+    if cache:
+        logging.info(f"Place cache stats: {cache.stats()}")
+    logging.info(f"Throttle state: {rate_limiter.stats()}")
+    spans.log_summary()
     return businesses
 
-def main(search_term):
-    """Main function to run the Google Maps scraper."""
+def main(search_term, driver=None, pool=None, cache=None, output_dir="", progress=None, checkpoint=None, spans=None):
+    """Main function to run the Google Maps scraper. CSVs are written to output_dir (default: cwd)."""
     logging.info(f"\n=== Starting Google Maps Scrape for: {search_term} ===")
+    spans = spans or SpanRecorder()
     try:
-        businesses = scrape_google_maps(search_term)
+        sink = CsvSink(output_dir)
+        try:
+            businesses = scrape_google_maps(search_term, driver=driver, pool=pool, cache=cache, sink=sink,
+                                            progress=progress, checkpoint=checkpoint, spans=spans)
+        finally:
+            with spans.span("export_finalize"):
+                sink.close()
         if businesses:
             logging.info(f"\nFound {len(businesses)} unique businesses:")
             for i, (name, website, phone) in enumerate(businesses, 1):
                 logging.info(f"{i}. {name}: {website or 'N/A'}, {phone or 'N/A'}")
-            save_to_csv(businesses)
-            save_websites_to_csv(businesses)
         else:
             logging.info("No businesses found.")
         return businesses
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+SPAN_LIMIT = int(os.getenv("SPAN_LIMIT", "5000"))
+# Durations kept per span name for the percentiles; count, total and max stay exact.
+SPAN_SAMPLE_SIZE = int(os.getenv("SPAN_SAMPLE_SIZE", "1000"))
+SPANS_TTL = int(os.getenv("SPANS_TTL", str(24 * 3600)))
+
+_local = threading.local()
+
+
+def spans_key(job_id):
+    """Redis list holding a job's raw timing spans as JSON strings."""
+    return f"job:{job_id}:spans"
+
+
+def count_attempt():
+    """Count one attempt against the innermost open span on this thread; retried functions call it first."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1]["attempts"] += 1
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+class SpanRecorder:
+    """Timing spans for one scrape: what ran, for how long, how many attempts it took and how it ended.
+
+    Use `with spans.span("detail_page", url=url) as span:` from any thread and set
+    span["outcome"] to override the default "ok"; a block that raises ends with the exception's
+    class name as its outcome. Only the first SPAN_LIMIT spans are kept individually, but
+    every span counts towards summary(). Its p50/p95 come from a uniform random sample of at
+    most SPAN_SAMPLE_SIZE durations per name (reservoir sampling), so memory stays bounded
+    on long jobs.
+    """
+
+    def __init__(self, limit=None, sample_size=None):
+        self.limit = limit or SPAN_LIMIT
+        self.sample_size = sample_size or SPAN_SAMPLE_SIZE
+        self.started = time.time()
+        self.spans = []
+        self._stats = {}
+        self._random = random.Random()
+        self._saved = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = dict(attrs, name=name, attempts=0, outcome="ok")
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(span)
+        began = time.time()
+        try:
+            yield span
+        except BaseException as e:
+            span["outcome"] = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            span["start"] = round(began - self.started, 3)
+            span["duration"] = round(time.time() - began, 3)
+            span["retries"] = max(span.pop("attempts") - 1, 0)
+            self._add(span)
+
+    def _add(self, span):
+        duration = span["duration"]
+        with self._lock:
+            stats = self._stats.setdefault(span["name"], {"count": 0, "total": 0.0, "max": 0.0, "sample": [],
+                                                          "retries": 0, "outcomes": {}})
+            stats["count"] += 1
+            stats["total"] += duration
+            stats["max"] = max(stats["max"], duration)
+            # Algorithm R: the n-th duration replaces a random kept one with probability size/n.
+            if len(stats["sample"]) < self.sample_size:
+                stats["sample"].append(duration)
+            else:
+                slot = self._random.randrange(stats["count"])
+                if slot < self.sample_size:
+                    stats["sample"][slot] = duration
+            stats["retries"] += span["retries"]
+            stats["outcomes"][span["outcome"]] = stats["outcomes"].get(span["outcome"], 0) + 1
+            if len(self.spans) < self.limit:
+                self.spans.append(span)
+
+    def summary(self):
+        """Per span name: count, total/mean/p50/p95/max seconds, retries and outcome counts."""
+        with self._lock:
+            stats = {name: dict(s, sample=list(s["sample"]), outcomes=dict(s["outcomes"]))
+                     for name, s in self._stats.items()}
+        summary = {}
+        for name, s in stats.items():
+            sample = sorted(s["sample"])
+            summary[name] = {
+                "count": s["count"],
+                "total_seconds": round(s["total"], 3),
+                "mean_seconds": round(s["total"] / s["count"], 3),
+                "p50_seconds": _percentile(sample, 50),
+                "p95_seconds": _percentile(sample, 95),
+                "max_seconds": s["max"],
+                "retries": s["retries"],
+                "outcomes": s["outcomes"]
+            }
+        return summary
+
+    def save(self, conn, job_id):
+        """Append spans recorded since the last save to the job's Redis list."""
+        with self._lock:
+            new = self.spans[self._saved:]
+            self._saved = len(self.spans)
+        if not new:
+            return
+        try:
+            pipe = conn.pipeline()
+            pipe.rpush(spans_key(job_id), *[json.dumps(span) for span in new])
+            pipe.expire(spans_key(job_id), SPANS_TTL)
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Could not save timing spans for job {job_id}: {str(e)}")
+
+    def log_summary(self):
+        for name, stats in sorted(self.summary().items(), key=lambda item: -item[1]["total_seconds"]):
+            logging.info(f"Timing {name}: {stats['count']}x, {stats['total_seconds']}s total, "
+                         f"p50 {stats['p50_seconds']}s, p95 {stats['p95_seconds']}s, "
+                         f"{stats['retries']} retries, {stats['outcomes']}")
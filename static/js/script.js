@@ -51,7 +51,7 @@ document.getElementById('scrapeBtn').addEventListener('click', async () => {
         }
 
         const jobId = data.job_id;
-        pollJobStatus(jobId);
+        watchJob(jobId);
 
     } catch (error) {
         progressDiv.classList.add('bg-red-100');
@@ -61,7 +61,103 @@ document.getElementById('scrapeBtn').addEventListener('click', async () => {
     }
 });
 
-function pollJobStatus(jobId, startTime = Date.now()) {
+// Only http(s) links are clickable; anything else (javascript:, data:, 'N/A') is shown as text.
+function safeHref(url) {
+    try {
+        const parsed = new URL(url);
+        return ['http:', 'https:'].includes(parsed.protocol) ? parsed.href : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+// Rows hold text scraped from third-party pages, so they are built with textContent, never innerHTML.
+function businessRow(business) {
+    const row = document.createElement('tr');
+    const cell = () => {
+        const td = document.createElement('td');
+        td.className = 'px-6 py-4 whitespace-nowrap';
+        row.appendChild(td);
+        return td;
+    };
+
+    cell().textContent = business.business_name;
+    const websiteCell = cell();
+    const href = safeHref(business.website);
+    if (href) {
+        const link = document.createElement('a');
+        link.href = href;
+        link.target = '_blank';
+        link.rel = 'noopener noreferrer';
+        link.className = 'text-blue-600 hover:underline';
+        link.textContent = business.website;
+        websiteCell.appendChild(link);
+    } else {
+        websiteCell.textContent = business.website;
+    }
+    cell().textContent = business.phone;
+    return row;
+}
+
+const PHASE_LABELS = {
+    starting: 'Starting browser',
+    searching: 'Searching Google Maps',
+    harvesting: 'Collecting businesses',
+    extracting: 'Extracting details',
+    done: 'Finishing up'
+};
+
+function showProgress(progress) {
+    const progressText = document.getElementById('progressText');
+    const progressBar = document.getElementById('progressBar');
+    const etaText = document.getElementById('etaText');
+
+    if (!progress || !progress.links_discovered) {
+        progressText.textContent = progress ? `${PHASE_LABELS[progress.phase] || 'Working'}...` : 'Scraping is in progress, please wait...';
+        return;
+    }
+    const percent = Math.min(95, Math.round(100 * progress.pages_extracted / progress.links_discovered));
+    progressBar.style.width = `${percent}%`;
+    progressText.textContent = `${PHASE_LABELS[progress.phase] || 'Working'}: ${progress.pages_extracted}/${progress.links_discovered} pages, ${progress.phones_found} phones found`;
+    etaText.textContent = progress.eta_seconds != null ? `About ${Math.ceil(progress.eta_seconds / 60)} min remaining` : '';
+}
+
+function watchJob(jobId) {
+    // Server-Sent Events push progress and rows; polling is only the fallback.
+    if (!window.EventSource) {
+        pollJobStatus(jobId);
+        return;
+    }
+    const resultsDiv = document.getElementById('results');
+    const resultsTable = document.getElementById('resultsTable');
+    const loadingSpinner = document.getElementById('loadingSpinner');
+    const source = new EventSource(`/scrape_events/${jobId}`);
+    let cursor = 0;
+
+    source.addEventListener('progress', event => {
+        loadingSpinner.classList.add('hidden');
+        showProgress(JSON.parse(event.data));
+    });
+    source.addEventListener('row', event => {
+        const data = JSON.parse(event.data);
+        if (data.index < cursor) return;
+        cursor = data.index + 1;
+        resultsDiv.classList.remove('hidden');
+        resultsTable.appendChild(businessRow(data.row));
+    });
+    ['done', 'failed'].forEach(name => source.addEventListener(name, () => {
+        // One status request picks up the final result or error message
+        source.close();
+        pollJobStatus(jobId, Date.now(), cursor);
+    }));
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            pollJobStatus(jobId, Date.now(), cursor);
+        }
+    };
+}
+
+function pollJobStatus(jobId, startTime = Date.now(), cursor = 0) {
     const progressDiv = document.getElementById('progress');
     const progressText = document.getElementById('progressText');
     const progressBar = document.getElementById('progressBar');
@@ -81,31 +177,29 @@ function pollJobStatus(jobId, startTime = Date.now()) {
         .then(response => response.json())
         .then(data => {
             if (data.status === 'running') {
-                // Update progress bar - maybe with a pulsing animation or indeterminate state
-                const currentWidth = parseFloat(progressBar.style.width) || 0;
-                const newWidth = currentWidth < 95 ? currentWidth + 2 : 95; // Slow progress
-                progressBar.style.width = `${newWidth}%`;
-                progressText.textContent = 'Scraping is in progress, please wait...';
-                setTimeout(() => pollJobStatus(jobId, startTime), 3000); // Poll every 3 seconds
+                if (data.progress) {
+                    // Real progress is on screen now, so drop the full-page spinner
+                    loadingSpinner.classList.add('hidden');
+                }
+                showProgress(data.progress);
+                // Show rows as soon as the worker extracts them
+                if (data.rows && data.rows.length > 0) {
+                    resultsDiv.classList.remove('hidden');
+                    data.rows.forEach(business => resultsTable.appendChild(businessRow(business)));
+                }
+                setTimeout(() => pollJobStatus(jobId, startTime, data.cursor), 3000); // Poll every 3 seconds
 
             } else if (data.status === 'complete') {
                 progressBar.style.width = '100%';
                 progressDiv.classList.add('bg-green-100');
                 progressText.textContent = 'Scraping complete!';
+                document.getElementById('etaText').textContent = '';
                 loadingSpinner.classList.add('hidden');
                 scrapeBtn.disabled = false;
                 
                 resultsTable.innerHTML = ''; // Clear previous results
                 if (data.result && data.result.length > 0) {
-                    data.result.forEach(business => {
-                        const row = document.createElement('tr');
-                        row.innerHTML = `
-                            <td class="px-6 py-4 whitespace-nowrap">${business.business_name}</td>
-                            <td class="px-6 py-4 whitespace-nowrap"><a href="${business.website}" target="_blank" class="text-blue-600 hover:underline">${business.website}</a></td>
-                            <td class="px-6 py-4 whitespace-nowrap">${business.phone}</td>
-                        `;
-                        resultsTable.appendChild(row);
-                    });
+                    data.result.forEach(business => resultsTable.appendChild(businessRow(business)));
                 } else {
                     resultsTable.innerHTML = '<tr><td colspan="3" class="text-center py-4">No businesses found.</td></tr>';
                 }
@@ -0,0 +1,49 @@
+import os
+import re
+import time
+import shutil
+import logging
+
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.join(os.getcwd(), "output"))
+OUTPUT_RETENTION = int(os.getenv("OUTPUT_RETENTION", str(24 * 3600)))
+EXPORT_FILES = ("phones.csv", "websites.csv")
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def job_dir(job_id, create=False):
+    """Directory holding one job's exports. Returns None for IDs that aren't safe path components."""
+    if not job_id or not JOB_ID_RE.match(job_id):
+        return None
+    path = os.path.join(OUTPUT_DIR, job_id)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def job_file(job_id, filename):
+    """Path to one of a job's export files, or None if the job ID or filename is not allowed."""
+    directory = job_dir(job_id)
+    if directory is None or filename not in EXPORT_FILES:
+        return None
+    return os.path.join(directory, filename)
+
+
+def sweep_outputs(max_age=None):
+    """Delete job directories older than OUTPUT_RETENTION seconds. Returns how many were removed."""
+    max_age = max_age if max_age is not None else OUTPUT_RETENTION
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(OUTPUT_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path)
+                removed += 1
+        except OSError as e:
+            logging.warning(f"Could not remove old output {entry.path}: {str(e)}")
+    if removed:
+        logging.info(f"Removed {removed} expired job output directories.")
+    return removed
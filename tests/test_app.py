@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+import json
+import fakeredis
+import app
+from progress import rows_key
+
+
+class StartScrapeTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = fakeredis.FakeStrictRedis()
+        patcher = mock.patch.object(app, "conn", self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.app.test_client()
+
+    def test_parse_max_age(self):
+        self.assertEqual(app.parse_max_age(60), 60.0)
+        self.assertEqual(app.parse_max_age("30"), 30.0)
+        for value in ("soon", None, [], True, -1, float("nan"), float("inf")):
+            self.assertIsNone(app.parse_max_age(value), value)
+
+    def test_invalid_max_age_is_a_client_error(self):
+        response = self.client.post("/start_scrape", json={"search_term": "dentists", "max_age": "soon"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("max_age", response.get_json()["error"])
+
+    def test_lock_contention_asks_the_client_to_retry(self):
+        key = app.query_key("dentists")
+        held = self.conn.lock(f"{key}:lock", timeout=10)
+        self.assertTrue(held.acquire())
+        with mock.patch.object(app, "QUERY_LOCK_WAIT", 0.1):
+            response = self.client.post("/start_scrape", json={"search_term": "dentists"})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+
+class ScrapeEventsTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = fakeredis.FakeStrictRedis()
+        queue = app.Queue(connection=self.conn)
+        self.job = queue.enqueue("os.getcwd")
+        for name, value in (("conn", self.conn), ("q", queue), ("sse_slots", app.threading.BoundedSemaphore(1)),
+                            ("SSE_MAX_SECONDS", 0.2), ("SSE_HEARTBEAT_SECONDS", 0.05)):
+            patcher = mock.patch.object(app, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = app.app.test_client()
+
+    def test_streams_beyond_the_cap_are_refused(self):
+        first = self.client.get(f"/scrape_events/{self.job.id}", buffered=False)
+        self.assertEqual(first.status_code, 200)
+        second = self.client.get(f"/scrape_events/{self.job.id}")
+        self.assertEqual(second.status_code, 503)
+        self.assertIn("Retry-After", second.headers)
+        first.close()
+
+    def test_a_closed_stream_frees_its_slot(self):
+        response = self.client.get(f"/scrape_events/{self.job.id}")
+        # The stream ended at SSE_MAX_SECONDS with keep-alives only.
+        self.assertIn(b": keep-alive", response.data)
+        response.close()
+        again = self.client.get(f"/scrape_events/{self.job.id}", buffered=False)
+        self.assertEqual(again.status_code, 200)
+        again.close()
+
+    def test_a_malformed_last_event_id_falls_back_to_the_cursor(self):
+        for index in range(3):
+            self.conn.rpush(rows_key(self.job.id), json.dumps({"business_name": f"B{index}"}))
+        response = self.client.get(f"/scrape_events/{self.job.id}?cursor=1", headers={"Last-Event-ID": "abc"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'"B0"', response.data)
+        self.assertIn(b'"B1"', response.data)
+        response.close()
+        response = self.client.get(f"/scrape_events/{self.job.id}", headers={"Last-Event-ID": "2"})
+        self.assertNotIn(b'"B1"', response.data)
+        self.assertIn(b'"B2"', response.data)
+        response.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
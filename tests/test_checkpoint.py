@@ -0,0 +1,165 @@
+import os
+import unittest
+from unittest import mock
+import fakeredis
+import throttle
+import scrape_maps_phones
+from checkpoint import Checkpoint
+from driver_resolver import find_chrome
+from fake_maps import business, start_server
+from spans import SpanRecorder
+
+TERM = "dental clinics in testville"
+LINKS = [f"https://maps.test/maps{business(TERM, i)['url']}" for i in range(6)]
+
+
+def info(url):
+    """What the fake site's place page for url says, as (name, website, phone)."""
+    b = business(TERM, LINKS.index(url))
+    return b["name"], b["website"], b["phone"]
+
+
+class FakeDriver:
+    def execute_script(self, script, *args):
+        return ""
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = fakeredis.FakeStrictRedis()
+
+    def test_round_trip(self):
+        checkpoint = Checkpoint(self.conn, TERM, interval=60)
+        for link in LINKS:
+            checkpoint.add_link(link)
+        checkpoint.add_result(LINKS[0], info(LINKS[0]))
+        checkpoint.set_harvested()
+
+        # Normalized like the query key: case and spacing don't matter.
+        restored = Checkpoint(self.conn, "  Dental Clinics in  Testville ")
+        self.assertTrue(restored.load())
+        self.assertEqual(restored.frontier, LINKS)
+        self.assertEqual(restored.done, {LINKS[0]: info(LINKS[0])})
+        self.assertTrue(restored.harvested)
+
+        restored.finish()
+        self.assertTrue(restored.complete)
+        self.assertFalse(Checkpoint(self.conn, TERM).load())
+
+    def test_empty_results_are_not_marked_done(self):
+        checkpoint = Checkpoint(self.conn, TERM, interval=0)
+        checkpoint.add_link(LINKS[0])
+        checkpoint.add_result(LINKS[0], ("", "", ""))
+        restored = Checkpoint(self.conn, TERM)
+        restored.load()
+        self.assertEqual(restored.done, {})
+
+    def test_links_appended_by_two_jobs_are_loaded_once(self):
+        for _ in range(2):
+            checkpoint = Checkpoint(self.conn, TERM, interval=0)
+            for link in LINKS[:3]:
+                checkpoint.add_link(link)
+            checkpoint.flush()
+        restored = Checkpoint(self.conn, TERM)
+        restored.load()
+        self.assertEqual(restored.frontier, LINKS[:3])
+
+
+class ResumeTest(unittest.TestCase):
+    """scrape_google_maps against a checkpointed frontier, with page visits answered from fake_maps data."""
+
+    def setUp(self):
+        self.conn = fakeredis.FakeStrictRedis()
+        checkpoint = Checkpoint(self.conn, TERM, interval=0)
+        for link in LINKS:
+            checkpoint.add_link(link)
+        checkpoint.set_harvested()
+        self.visited = []
+        patcher = mock.patch.object(throttle, "_shared", throttle.AdaptiveThrottle(min_interval=0, floor=0.001))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, visit):
+        def recorded(driver, url, selectors=None):
+            self.visited.append(url)
+            return visit(url)
+
+        checkpoint = Checkpoint(self.conn, TERM, interval=0)
+        with mock.patch.object(scrape_maps_phones, "extract_business_info", recorded):
+            businesses = scrape_maps_phones.scrape_google_maps(TERM, driver=FakeDriver(), checkpoint=checkpoint)
+        return businesses, checkpoint
+
+    def test_blocked_pages_are_retried_on_resume(self):
+        blocked = {LINKS[1], LINKS[4]}
+        businesses, checkpoint = self.scrape(lambda url: ("", "", "") if url in blocked else info(url))
+        self.assertEqual(len(businesses), 4)
+        self.assertFalse(checkpoint.complete)
+
+        self.visited.clear()
+        businesses, checkpoint = self.scrape(info)
+        self.assertEqual(sorted(self.visited), sorted(blocked))
+        self.assertEqual(businesses, [info(link) for link in LINKS])
+        self.assertTrue(checkpoint.complete)
+
+    def test_fatal_errors_propagate_after_saving_progress(self):
+        def crash_on_fourth(url):
+            if url == LINKS[3]:
+                raise RuntimeError("browser crashed")
+            return info(url)
+
+        with self.assertRaises(RuntimeError):
+            self.scrape(crash_on_fourth)
+        saved = Checkpoint(self.conn, TERM)
+        saved.load()
+        self.assertEqual(set(saved.done), set(LINKS[:3]))
+
+
+class ChromeResumeTest(unittest.TestCase):
+    """An interrupted scrape of fake_maps.py in a real browser, resumed from its checkpoint."""
+
+    RESULTS = 8
+
+    def setUp(self):
+        if not find_chrome():
+            self.skipTest("Chrome is not installed")
+        patcher = mock.patch.dict(os.environ, {"HEADLESS": "true"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.driver = scrape_maps_phones.setup_driver()
+        if not self.driver:
+            self.skipTest("Chrome could not be started")
+        self.addCleanup(self.driver.quit)
+        server, self.maps_url = start_server(results=self.RESULTS, page_size=self.RESULTS)
+        self.addCleanup(server.shutdown)
+        self.conn = fakeredis.FakeStrictRedis()
+
+    def scrape(self, spans):
+        return scrape_maps_phones.scrape_google_maps(
+            TERM, max_time=120, driver=self.driver, checkpoint=Checkpoint(self.conn, TERM, interval=0),
+            base_url=self.maps_url, spans=spans, rate_limiter=throttle.AdaptiveThrottle(min_interval=0, floor=0))
+
+    def test_resume_visits_only_the_missing_pages(self):
+        visit = scrape_maps_phones.extract_business_info
+        visited = []
+
+        def crash_after_three(driver, url, selectors=None):
+            if len(visited) == 3:
+                raise RuntimeError("browser crashed")
+            visited.append(url)
+            return visit(driver, url, selectors)
+
+        with mock.patch.object(scrape_maps_phones, "extract_business_info", crash_after_three):
+            with self.assertRaises(RuntimeError):
+                self.scrape(SpanRecorder())
+
+        spans = SpanRecorder()
+        businesses = self.scrape(spans)
+        summary = spans.summary()
+        self.assertNotIn("search", summary)
+        self.assertEqual(summary["detail_page"]["count"], self.RESULTS - 3)
+        self.assertEqual(len(businesses), self.RESULTS)
+        self.assertFalse(Checkpoint(self.conn, TERM).load())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+import unittest
+import fakeredis
+from dedup import (normalize_phone, normalize_domain, normalize_name, business_keys, merge_business, BusinessSet,
+                   DedupIndex)
+from place_cache import PlaceCache
+
+PLACE_A = "https://www.google.com/maps/place/Acme+Dental/data=!4m2!3m1!1s0x1:0xa!19sChIJaaa"
+PLACE_B = "https://www.google.com/maps/place/Acme+Dental/data=!4m2!3m1!1s0x1:0xb!19sChIJbbb"
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone("+1 (555) 010-2000"), "+15550102000")
+        self.assertEqual(normalize_phone("0044 20 7946 0000"), "+442079460000")
+        self.assertEqual(normalize_phone("020 7946 0000", country_code="44"), "+442079460000")
+        self.assertEqual(normalize_phone("555-0100", country_code=""), "5550100")
+        self.assertEqual(normalize_phone(""), "")
+
+    def test_normalize_domain_and_name(self):
+        self.assertEqual(normalize_domain("https://www.Acme.example/contact"), "acme.example")
+        self.assertEqual(normalize_domain("acme.example"), "acme.example")
+        self.assertEqual(normalize_name("Acme Dental, Ltd."), "acmedentalltd")
+
+
+class BusinessKeysTest(unittest.TestCase):
+    def test_place_id_comes_first(self):
+        keys = business_keys(("Acme", "https://acme.example", "+15550100"), PLACE_A)
+        self.assertEqual(keys[0], ("place", "pid:ChIJaaa"))
+        self.assertIn(("phone", "+15550100", "acme"), keys)
+        self.assertIn(("domain", "acme.example", "acme"), keys)
+
+    def test_phone_is_paired_with_the_name(self):
+        self.assertNotEqual(business_keys(("Acme North", "", "+15550100")),
+                            business_keys(("Acme South", "", "+15550100")))
+
+    def test_name_only_when_nothing_else(self):
+        self.assertEqual(business_keys(("Acme", "", "")), [("name", "acme")])
+        self.assertEqual(business_keys(("", "", "")), [])
+
+    def test_merge_business_fills_blanks(self):
+        self.assertEqual(merge_business(("Acme", "", "+1"), ("Other", "https://a", "+2")), ("Acme", "https://a", "+1"))
+
+
+class BusinessSetTest(unittest.TestCase):
+    def test_same_place_with_and_without_phone_is_one_business(self):
+        businesses = BusinessSet()
+        self.assertTrue(businesses.add(("Acme", "", ""), PLACE_A))
+        self.assertFalse(businesses.add(("Acme", "https://acme.example", "+15550100"), PLACE_A))
+        self.assertEqual(businesses.values(), [("Acme", "https://acme.example", "+15550100")])
+
+    def test_places_sharing_a_switchboard_stay_apart(self):
+        businesses = BusinessSet()
+        self.assertTrue(businesses.add(("Acme Dental", "", "+15550100"), PLACE_A))
+        self.assertTrue(businesses.add(("Acme Dental", "", "+15550100"), PLACE_B))
+        self.assertEqual(len(businesses), 2)
+
+    def test_secondary_match_without_a_place_url(self):
+        businesses = BusinessSet()
+        businesses.add(("Acme", "", "+1 555 0100"), PLACE_A)
+        self.assertFalse(businesses.add(("ACME", "https://acme.example", "+15550100")))
+        self.assertTrue(businesses.add(("Other", "", "+15550100")))
+        self.assertEqual(businesses.values()[0], ("Acme", "https://acme.example", "+1 555 0100"))
+
+
+class DedupIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.index = DedupIndex(fakeredis.FakeStrictRedis(server=self.server))
+
+    def test_merge_and_get(self):
+        first, _ = self.index.merge(PLACE_A, ("Acme", "", ""))
+        second, merged = self.index.merge(PLACE_A, ("Acme", "https://acme.example", "+15550100"))
+        self.assertEqual(first, second)
+        self.assertEqual(merged, ("Acme", "https://acme.example", "+15550100"))
+        self.assertEqual(self.index.get(PLACE_A), merged)
+        self.assertIsNone(self.index.get(PLACE_B))
+
+    def test_stats_count_index_and_fallback_hits(self):
+        conn = fakeredis.FakeStrictRedis(server=self.server)
+        index = DedupIndex(conn, fallback=PlaceCache(conn))
+        index.set(PLACE_A, ("Acme", "", "+15550100"))
+        PlaceCache(conn).set(PLACE_B, ("Acme B", "", ""))
+        for _ in range(5):
+            index.get(PLACE_A)
+        index.get(PLACE_B)
+        index.get("https://www.google.com/maps/place/Other/data=!19sChIJccc")
+        stats = index.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (6, 1, 0.8571))
+        self.assertEqual(stats["index"], {"hits": 5, "misses": 2})
+        self.assertEqual(stats["fallback"]["hits"], 1)
+
+    def test_places_sharing_a_phone_get_separate_records(self):
+        first, _ = self.index.merge(PLACE_A, ("Acme Dental", "", "+15550100"))
+        second, _ = self.index.merge(PLACE_B, ("Acme Dental", "", "+15550100"))
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.index.lookup(PLACE_B), second)
+
+    def test_concurrent_merges_agree_on_one_id(self):
+        ids = []
+        barrier = threading.Barrier(8)
+
+        def merge():
+            index = DedupIndex(fakeredis.FakeStrictRedis(server=self.server))
+            barrier.wait()
+            ids.append(index.merge(PLACE_A, ("Acme", "", "+15550100"))[0])
+
+        threads = [threading.Thread(target=merge) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(ids)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
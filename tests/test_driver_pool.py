@@ -0,0 +1,77 @@
+import time
+import threading
+import unittest
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.healthy = True
+        self.quitting = threading.Event()
+        self.may_quit = threading.Event()
+        self.may_quit.set()
+        self.window_handles = ["main"]
+        self.switch_to = self
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        return 1 if self.healthy else 0
+
+    def window(self, handle):
+        pass
+
+    def execute_cdp_cmd(self, command, params):
+        pass
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quitting.set()
+        self.may_quit.wait(5)
+        self.quit_calls += 1
+
+
+class DriverPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.started = []
+
+        def factory():
+            self.started.append(FakeDriver())
+            return self.started[-1]
+
+        self.pool = DriverPool(size=2, max_age=60, max_uses=10, factory=factory)
+
+    def test_warm_sessions_are_reused(self):
+        driver = self.pool.acquire()
+        self.pool.release(driver)
+        self.assertIs(self.pool.acquire(), driver)
+        self.assertEqual(len(self.started), 1)
+
+    def test_a_hung_quit_does_not_block_other_acquirers(self):
+        stale = self.pool.acquire()
+        self.pool.release(stale)
+        stale.healthy = False
+        stale.may_quit.clear()
+        recycler = threading.Thread(target=self.pool.acquire)
+        recycler.start()
+        self.assertTrue(stale.quitting.wait(5))
+        # The first acquire is stuck in quit(); this one must still get a browser straight away.
+        began = time.time()
+        self.assertIsNotNone(self.pool.acquire(timeout=1))
+        self.assertLess(time.time() - began, 1)
+        stale.may_quit.set()
+        recycler.join(5)
+        self.assertEqual(stale.quit_calls, 1)
+        self.assertEqual(len(self.started), 3)
+
+    def test_close_quits_idle_sessions(self):
+        driver = self.pool.acquire()
+        self.pool.release(driver)
+        self.pool.close()
+        self.assertEqual(driver.quit_calls, 1)
+        self.assertIsNone(self.pool.acquire(timeout=0.1))
+
+
+if __name__ == "__main__":
+    unittest.main()
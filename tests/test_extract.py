@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import throttle
+import scrape_maps_phones
+from throttle import AdaptiveThrottle
+
+
+class ExtractBusinessesTest(unittest.TestCase):
+    def setUp(self):
+        self.throttle = AdaptiveThrottle(min_interval=0, max_concurrent=4, floor=0.001)
+
+    def test_returns_results_in_link_order(self):
+        links = [f"https://maps.test/maps/place/{i}" for i in range(6)]
+
+        def visit(driver, url, selectors=None):
+            time.sleep(0.01)
+            return f"Business {url[-1]}", "", "+15550000"
+
+        with mock.patch.object(scrape_maps_phones, "extract_business_info", visit):
+            results = scrape_maps_phones.extract_businesses(links, ["a", "b", "c"], rate_limiter=self.throttle)
+        self.assertEqual([link for link, _ in results], links)
+
+    def test_threads_are_joined_before_an_error_propagates(self):
+        links = [f"https://maps.test/maps/place/{i}" for i in range(8)]
+        busy = []
+        lock = threading.Lock()
+
+        def visit(driver, url, selectors=None):
+            if driver == "first":
+                raise RuntimeError("browser crashed")
+            with lock:
+                busy.append(driver)
+            time.sleep(0.05)
+            with lock:
+                busy.remove(driver)
+            return "Name", "", ""
+
+        with mock.patch.object(scrape_maps_phones, "extract_business_info", visit):
+            with self.assertRaises(RuntimeError):
+                scrape_maps_phones.extract_businesses(links, ["first", "second"], rate_limiter=self.throttle)
+        # Nothing may still be using "second" once the caller gets the drivers back.
+        self.assertEqual(busy, [])
+
+
+class FakePlacePage:
+    """A driver whose place page renders its h1 only after `failures` timed-out loads."""
+
+    def __init__(self, failures, signal=""):
+        self.failures = failures
+        self.signal = signal
+        self.loads = 0
+
+    def get(self, url):
+        self.loads += 1
+
+    def execute_script(self, script, *args):
+        if script == scrape_maps_phones.PLACE_DETAILS_SCRIPT:
+            return {"name": "Acme Dental", "website": "https://acme.example/?utm=x", "phone": "Phone: +1 555 0100"}
+        return self.signal
+
+
+class FakeWait:
+    def __init__(self, driver, timeout, **kwargs):
+        self.driver = driver
+
+    def until(self, condition):
+        if self.driver.loads <= self.driver.failures:
+            raise scrape_maps_phones.TimeoutException()
+        return True
+
+
+class PlaceDetailsTest(unittest.TestCase):
+    def setUp(self):
+        for target, name, value in ((scrape_maps_phones, "WebDriverWait", FakeWait),
+                                    (throttle, "_shared", AdaptiveThrottle(min_interval=0, floor=0))):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_timeouts_are_retried(self):
+        driver = FakePlacePage(failures=2)
+        details = scrape_maps_phones.extract_place_details(driver, "https://maps.test/maps/place/1")
+        self.assertEqual(driver.loads, 3)
+        self.assertEqual((details["name"], details["website"], details["phone"]),
+                         ("Acme Dental", "https://acme.example/", "+15550100"))
+
+    def test_gives_up_after_three_attempts(self):
+        driver = FakePlacePage(failures=5)
+        details = scrape_maps_phones.extract_place_details(driver, "https://maps.test/maps/place/1")
+        self.assertEqual(driver.loads, 3)
+        self.assertFalse(any(details.values()))
+
+    def test_interstitials_are_not_retried(self):
+        driver = FakePlacePage(failures=5, signal="captcha")
+        scrape_maps_phones.extract_place_details(driver, "https://maps.test/maps/place/1")
+        self.assertEqual(driver.loads, 1)
+
+
+class PlaceSelectorsTest(unittest.TestCase):
+    def load(self, table):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(table, f)
+        self.addCleanup(os.unlink, f.name)
+        with mock.patch.dict(os.environ, {"PLACE_SELECTORS_FILE": f.name}):
+            return scrape_maps_phones.load_place_selectors()
+
+    def test_a_valid_file_is_used(self):
+        table = {"version": 2, "fields": {"name": [["h1.title", "text"]], "phone": []}}
+        self.assertEqual(self.load(table), table)
+
+    def test_malformed_files_fall_back_to_the_built_in_table(self):
+        for table in ({"version": 2}, {"version": 2, "fields": []}, {"fields": {"name": [["h1", "text"]]}},
+                      {"version": 2, "fields": {"name": "h1"}}, {"version": 2, "fields": {"name": [["h1"]]}}, []):
+            self.assertIs(self.load(table), scrape_maps_phones.PLACE_SELECTORS, table)
+
+
+class FeedModeTest(unittest.TestCase):
+    """Feed mode over two results pages: cards are read on every harvester step, not just at the end."""
+
+    PAGES = [
+        [("https://maps.test/maps/place/1", ("One", "https://one.example/", "+15550001")),
+         ("https://maps.test/maps/place/2", ("Two", "", ""))],
+        [("https://maps.test/maps/place/3", ("Three", "", "+15550003"))]
+    ]
+    # Harvested, but its card was never read (e.g. it scrolled out before a step).
+    UNCARDED = "https://maps.test/maps/place/4"
+
+    def test_cards_from_every_page_are_kept(self):
+        test = self
+        page = []
+
+        class FakeHarvester:
+            def __init__(self, *args, on_step=None, **kwargs):
+                self.on_step = on_step
+                self.links = []
+                self.completed = True
+
+            def __iter__(self):
+                for cards in test.PAGES:
+                    page[:] = cards
+                    self.on_step()
+                    fresh = [url for url, _ in cards]
+                    self.links.extend(fresh)
+                    yield from fresh
+                self.links.append(test.UNCARDED)
+                yield test.UNCARDED
+
+        visited = []
+
+        def visit(driver, url, selectors=None):
+            visited.append(url)
+            return {"https://maps.test/maps/place/2": ("Two", "", "+15550002"),
+                    test.UNCARDED: ("Four", "", "+15550004")}[url]
+
+        driver = mock.Mock()
+        driver.execute_script.return_value = ""
+        with mock.patch.object(scrape_maps_phones, "FeedHarvester", FakeHarvester), \
+                mock.patch.object(scrape_maps_phones, "WebDriverWait"), \
+                mock.patch.object(scrape_maps_phones, "extract_feed_cards", lambda d, selector: list(page)), \
+                mock.patch.object(scrape_maps_phones, "extract_business_info", visit):
+            businesses = scrape_maps_phones.scrape_google_maps(
+                "dentists", driver=driver, mode="feed", concurrency=1,
+                rate_limiter=AdaptiveThrottle(min_interval=0, floor=0))
+
+        self.assertEqual(sorted(visited), ["https://maps.test/maps/place/2", self.UNCARDED])
+        self.assertEqual([name for name, _, _ in businesses], ["One", "Two", "Three", "Four"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+import fakeredis
+import metrics
+from metrics import METRICS_KEY, WORKER_NAME, _series, incr, observe, render
+from progress import JobProgress
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = fakeredis.FakeStrictRedis()
+        patcher = mock.patch.object(metrics, "_queue_series", return_value={"mapphone_rq_workers": 1})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_series_sorts_labels_with_le_last(self):
+        self.assertEqual(_series("mapphone_pages_total"), "mapphone_pages_total")
+        self.assertEqual(_series("x_bucket", {"status": "ok", "le": 5, "kind": "scrape"}),
+                         'x_bucket{kind="scrape",status="ok",le="5"}')
+
+    def test_render(self):
+        incr(self.conn, "mapphone_jobs_total", {"kind": "scrape", "status": "finished"})
+        incr(self.conn, "mapphone_jobs_total", {"kind": "scrape", "status": "finished"}, 2)
+        observe(self.conn, "mapphone_job_wait_seconds", 20, {"kind": "scrape"}, buckets=(5, 30))
+        lines = render(self.conn).splitlines()
+        self.assertIn('mapphone_jobs_total{kind="scrape",status="finished"} 3', lines)
+        start = lines.index("# TYPE mapphone_job_wait_seconds histogram")
+        self.assertEqual(lines[start + 1:start + 6], [
+            'mapphone_job_wait_seconds_bucket{kind="scrape",le="5"} 0',
+            'mapphone_job_wait_seconds_bucket{kind="scrape",le="30"} 1',
+            'mapphone_job_wait_seconds_bucket{kind="scrape",le="+Inf"} 1',
+            'mapphone_job_wait_seconds_count{kind="scrape"} 1',
+            'mapphone_job_wait_seconds_sum{kind="scrape"} 20'
+        ])
+        self.assertIn("mapphone_rq_workers 1", lines)
+        self.assertNotIn("# HELP mapphone_pages_total", "\n".join(lines))
+
+    def test_redis_errors_are_not_raised(self):
+        conn = mock.Mock()
+        conn.hincrbyfloat.side_effect = ConnectionError()
+        conn.pipeline.side_effect = ConnectionError()
+        incr(conn, "mapphone_jobs_total")
+        observe(conn, "mapphone_job_wait_seconds", 1)
+
+
+class PageCountTest(unittest.TestCase):
+    def test_pages_are_counted_once_per_save(self):
+        conn = fakeredis.FakeStrictRedis()
+        progress = JobProgress(mock.Mock(id="job1", meta={}), conn, min_interval=60)
+        progress.set_phase("extracting")
+        with mock.patch("progress.incr", wraps=metrics.incr) as counted:
+            for _ in range(5):
+                progress.page_done(("A", "", ""), added=False)
+            self.assertEqual(counted.call_count, 0)
+            progress.set_phase("done")
+        self.assertEqual(counted.call_count, 1)
+        self.assertEqual(conn.hget(METRICS_KEY, _series("mapphone_pages_total", {"worker": WORKER_NAME})), b"5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import gzip
+import json
+import unittest
+import fakeredis
+from place_cache import normalize_place_url
+from results import load_result, result_page, store_result
+
+
+class ResultTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = fakeredis.FakeStrictRedis()
+        self.businesses = [("A", "https://a.example/", "+15550001"), ("B", "", ""), ("C", "", "+15550003")]
+
+    def test_store_and_load(self):
+        cached = store_result(self.conn, "job1", self.businesses, {"search": {"count": 1}})
+        self.assertEqual(load_result(self.conn, "job1"), cached)
+        body = json.loads(gzip.decompress(cached["gzip"]))
+        self.assertEqual(body["status"], "complete")
+        self.assertEqual(body["performance"], {"search": {"count": 1}})
+        self.assertEqual(body["result"][1], {"business_name": "B", "website": "N/A", "phone": "N/A"})
+        self.assertEqual(cached["count"], 3)
+        self.assertIsNone(load_result(self.conn, "missing"))
+
+    def test_result_page(self):
+        store_result(self.conn, "job1", self.businesses)
+        page = json.loads(result_page(self.conn, "job1", 1, 5, 3))
+        self.assertEqual((page["offset"], page["limit"], page["total"]), (1, 5, 3))
+        self.assertEqual([row["business_name"] for row in page["result"]], ["B", "C"])
+        self.assertEqual(page["phones_csv"], "/download/job1/phones.csv")
+        self.assertEqual(json.loads(result_page(self.conn, "job1", 0, 0, 3))["result"], [])
+
+    def test_empty_result(self):
+        store_result(self.conn, "job1", [])
+        self.assertEqual(json.loads(result_page(self.conn, "job1", 0, 10, 0))["result"], [])
+
+
+class NormalizePlaceUrlTest(unittest.TestCase):
+    def test_place_id_wins(self):
+        url = ("https://www.google.com/maps/place/Acme+Dental/@31.5,74.3,17z/"
+               "data=!4m6!3m5!1s0x3919:0xABC!8m2!3d31.5!4d74.3!19sChIJabc-123?hl=en")
+        self.assertEqual(normalize_place_url(url), "pid:ChIJabc-123")
+
+    def test_feature_id(self):
+        url = "https://www.google.com/maps/place/Acme/data=!4m2!3m1!1s0x3919:0xABC"
+        self.assertEqual(normalize_place_url(url), "fid:0x3919:0xabc")
+
+    def test_name_fallback(self):
+        self.assertEqual(normalize_place_url("https://www.google.com/maps/place/Acme%20Dental/@31.5,74.3"),
+                         "name:acme dental")
+        self.assertEqual(normalize_place_url(""), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+import fakeredis
+from spans import SpanRecorder, count_attempt, spans_key
+
+
+class SpanRecorderTest(unittest.TestCase):
+    def record(self, spans, name, duration, outcome="ok"):
+        with mock.patch("spans.time.time", side_effect=[0.0, duration]):
+            with spans.span(name) as span:
+                span["outcome"] = outcome
+
+    def test_summary(self):
+        spans = SpanRecorder()
+        for duration in (0.1, 0.2, 0.3, 0.4):
+            self.record(spans, "detail_page", duration)
+        self.record(spans, "detail_page", 2.0, outcome="captcha")
+        stats = spans.summary()["detail_page"]
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual(stats["total_seconds"], 3.0)
+        self.assertEqual(stats["mean_seconds"], 0.6)
+        self.assertEqual((stats["p50_seconds"], stats["p95_seconds"], stats["max_seconds"]), (0.2, 2.0, 2.0))
+        self.assertEqual(stats["outcomes"], {"ok": 4, "captcha": 1})
+
+    def test_retries_and_exceptions(self):
+        spans = SpanRecorder()
+        with self.assertRaises(TimeoutError):
+            with spans.span("navigate"):
+                count_attempt()
+                count_attempt()
+                raise TimeoutError()
+        stats = spans.summary()["navigate"]
+        self.assertEqual((stats["retries"], stats["outcomes"]), (1, {"TimeoutError": 1}))
+
+    def test_sample_is_bounded_but_totals_are_exact(self):
+        spans = SpanRecorder(limit=10, sample_size=50)
+        for i in range(1, 1001):
+            self.record(spans, "detail_page", i / 1000)
+        stats = spans.summary()["detail_page"]
+        self.assertEqual(len(spans._stats["detail_page"]["sample"]), 50)
+        self.assertEqual(len(spans.spans), 10)
+        self.assertEqual(stats["count"], 1000)
+        self.assertEqual(stats["total_seconds"], 500.5)
+        self.assertEqual(stats["max_seconds"], 1.0)
+        # A uniform sample of 50 from 0.001..1.0 puts the median well inside the range.
+        self.assertTrue(0.2 < stats["p50_seconds"] < 0.8)
+
+    def test_save_appends_only_new_spans(self):
+        conn = fakeredis.FakeStrictRedis()
+        spans = SpanRecorder()
+        self.record(spans, "search", 0.5)
+        spans.save(conn, "job1")
+        self.record(spans, "detail_page", 0.25)
+        spans.save(conn, "job1")
+        spans.save(conn, "job1")
+        self.assertEqual(conn.llen(spans_key("job1")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
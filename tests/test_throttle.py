@@ -0,0 +1,83 @@
+import unittest
+from throttle import AdaptiveThrottle, DomainRateLimiter
+
+URL = "https://maps.test/maps/place/1"
+
+
+class AdaptiveThrottleTest(unittest.TestCase):
+    def make(self, **kwargs):
+        settings = dict(min_interval=0.5, max_concurrent=4, floor=0.1, ceiling=30, increase_after=3)
+        settings.update(kwargs)
+        return AdaptiveThrottle(**settings)
+
+    def domain(self, throttle):
+        return throttle.stats()["domains"]["maps.test"]
+
+    def test_healthy_requests_shorten_the_gap_down_to_the_floor(self):
+        throttle = self.make()
+        for _ in range(50):
+            throttle.record(URL, "ok")
+        self.assertEqual(self.domain(throttle)["interval"], 0.1)
+
+    def test_a_configured_interval_below_the_floor_is_kept(self):
+        throttle = self.make(min_interval=0.02)
+        throttle.record(URL, "ok")
+        self.assertEqual(self.domain(throttle)["interval"], 0.02)
+
+    def test_concurrency_grows_after_a_streak_of_successes(self):
+        throttle = self.make()
+        throttle.record(URL, "ok")
+        self.assertEqual(self.domain(throttle)["limit"], 2)
+        for _ in range(2):
+            throttle.record(URL, "ok")
+        self.assertEqual(self.domain(throttle)["limit"], 3)
+
+    def test_initial_concurrency_can_be_set(self):
+        throttle = self.make(max_concurrent=4, limit=4)
+        throttle.record(URL, "ok")
+        self.assertEqual(self.domain(throttle)["limit"], 4)
+        self.assertEqual(self.make(max_concurrent=2, limit=8).limit, 2)
+
+    def test_timeouts_back_off_multiplicatively(self):
+        throttle = self.make(max_concurrent=8)
+        throttle.record(URL, "timeout")
+        self.assertEqual(self.domain(throttle), {"interval": 1.0, "limit": 2, "latency": None})
+
+    def test_captcha_drops_to_one_request_at_a_time(self):
+        throttle = self.make()
+        throttle.record(URL, "captcha")
+        self.assertEqual(self.domain(throttle)["limit"], 1)
+        self.assertEqual(self.domain(throttle)["interval"], 4.0)
+
+    def test_backing_off_from_a_zero_gap(self):
+        throttle = self.make(min_interval=0, floor=0)
+        throttle.record(URL, "ok")
+        self.assertEqual(self.domain(throttle)["interval"], 0)
+        throttle.record(URL, "timeout")
+        self.assertGreater(self.domain(throttle)["interval"], 0)
+
+    def test_slow_pages_count_as_a_mild_penalty_after_warmup(self):
+        throttle = self.make()
+        for _ in range(AdaptiveThrottle.WARMUP_SAMPLES):
+            throttle.record(URL, "ok", latency=1.0)
+        before = self.domain(throttle)["interval"]
+        throttle.record(URL, "ok", latency=10.0)
+        self.assertAlmostEqual(self.domain(throttle)["interval"], before * 1.5, places=2)
+
+    def test_outcomes_are_counted_per_worker_index(self):
+        throttle = self.make()
+        throttle.record(URL, "ok", worker=0)
+        throttle.record(URL, "timeout", worker=1)
+        throttle.record(URL, "ok")
+        self.assertEqual(throttle.stats()["workers"], {"0": {"ok": 1}, "1": {"timeout": 1}, "search": {"ok": 1}})
+
+
+class DomainRateLimiterTest(unittest.TestCase):
+    def test_accepts_the_same_feedback_as_the_adaptive_throttle(self):
+        limiter = DomainRateLimiter(min_interval=0, max_concurrent=1)
+        with limiter.slot(URL):
+            limiter.record(URL, "ok", 0.1, worker=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
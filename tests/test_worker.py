@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import fakeredis
+import worker
+from metrics import METRICS_KEY
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class BatchTaskTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+        self.private = FakeDriver()
+        pool = mock.Mock()
+        pool.acquire.return_value = None
+        pool.is_healthy.side_effect = lambda driver: driver.execute_script("return 1;") == 1
+        for name, value in (("conn", fakeredis.FakeStrictRedis()), ("driver_pool", pool),
+                            ("setup_driver", mock.Mock(return_value=self.private))):
+            patcher = mock.patch.object(worker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_terms_share_one_private_driver_and_report_their_outcome(self):
+        outcomes = {
+            "complete term": ([("A", "", "+15550001")], True),
+            "partial term": ([("B", "", "+15550002")], False),
+            "blocked term": ([], False)
+        }
+        drivers = []
+
+        def scrape(term, driver=None, checkpoint=None, **kwargs):
+            drivers.append(driver)
+            found, checkpoint.complete = outcomes[term]
+            return found
+
+        with mock.patch.object(worker, "scrape_google_maps", scrape):
+            businesses = worker.run_batch_task(list(outcomes))
+
+        self.assertEqual(drivers, [self.private] * 3)
+        self.assertEqual(worker.setup_driver.call_count, 1)
+        self.assertEqual(self.private.quit_calls, 1)
+        self.assertEqual(businesses, [("A", "", "+15550001"), ("B", "", "+15550002")])
+
+    def test_failed_attempts_that_will_be_retried_are_counted_as_retried(self):
+        for retries_left, status in ((1, "retried"), (0, "failed")):
+            job = mock.Mock(id=f"job-{status}", meta={}, retries_left=retries_left, enqueued_at=None, started_at=None)
+            with mock.patch.object(worker, "get_current_job", return_value=job), \
+                    mock.patch.object(worker, "main", side_effect=RuntimeError("browser crashed")):
+                with self.assertRaises(RuntimeError):
+                    worker.run_scrape_task("dentists")
+        series = {key.decode(): value for key, value in worker.conn.hgetall(METRICS_KEY).items()}
+        self.assertEqual(series['mapphone_jobs_total{kind="scrape",status="retried"}'], b"1")
+        self.assertEqual(series['mapphone_jobs_total{kind="scrape",status="failed"}'], b"1")
+
+    def test_term_status(self):
+        checkpoint = mock.Mock(complete=False)
+        self.assertEqual(worker._term_status(checkpoint, [("A", "", "")])["status"], "partial")
+        self.assertEqual(worker._term_status(checkpoint, [])["status"], "failed")
+        checkpoint.complete = True
+        self.assertEqual(worker._term_status(checkpoint, [])["status"], "complete")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import os
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class DomainRateLimiter:
+    """Politeness limits per domain: a cap on in-flight requests and a minimum gap between request starts."""
+
+    def __init__(self, min_interval=None, max_concurrent=None):
+        self.min_interval = min_interval if min_interval is not None else float(os.getenv("DOMAIN_MIN_INTERVAL", "0.5"))
+        self.max_concurrent = max_concurrent or int(os.getenv("DOMAIN_MAX_CONCURRENT", "4"))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore(self, domain):
+        with self._lock:
+            if domain not in self._semaphores:
+                self._semaphores[domain] = threading.BoundedSemaphore(self.max_concurrent)
+            return self._semaphores[domain]
+
+    def wait(self, domain):
+        """Block until the next request to domain may start, and book that start time."""
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next_start.get(domain, 0))
+            self._next_start[domain] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the domain's concurrency slots for the duration of a request."""
+        domain = urlparse(url).netloc
+        semaphore = self._semaphore(domain)
+        with semaphore:
+            self.wait(domain)
+            yield
+
+    def record(self, url, outcome, latency=None, worker=None):
+        """Fixed limits ignore feedback; see AdaptiveThrottle."""
+
+    def stats(self):
+        """The fixed gap and concurrency cap every domain gets."""
+        return {"min_interval": self.min_interval, "max_concurrent": self.max_concurrent}
+
+
+class AdaptiveThrottle(DomainRateLimiter):
+    """DomainRateLimiter whose limits follow feedback from the requests it paces.
+
+    Callers report every request with record(url, outcome, latency, worker). Healthy requests
+    shorten the gap between starts by 10% (down to ADAPTIVE_MIN_INTERVAL, or to
+    DOMAIN_MIN_INTERVAL if that is lower) and, after
+    ADAPTIVE_INCREASE_AFTER in a row, allow one more request in flight (up to
+    DOMAIN_MAX_CONCURRENT). Bad signals multiply the gap (up to ADAPTIVE_MAX_INTERVAL):
+    pages several times slower than usual a little, timeouts more, and consent pages and
+    CAPTCHAs most; those two also drop concurrency to one and pause the domain. Each domain
+    starts with `limit` requests in flight (default: half of DOMAIN_MAX_CONCURRENT).
+    """
+
+    PENALTIES = {"slow": 1.5, "timeout": 2.0, "error": 2.0, "consent": 4.0, "captcha": 8.0}
+    SLOW_FACTOR = 3.0
+    # Gap a penalty starts from when the current one is shorter, so backing off from zero works.
+    MIN_BACKOFF = 0.1
+    WARMUP_SAMPLES = 5
+
+    def __init__(self, min_interval=None, max_concurrent=None, floor=None, ceiling=None, increase_after=None,
+                 limit=None):
+        super().__init__(min_interval, max_concurrent)
+        self.limit = min(self.max_concurrent, limit or max(1, self.max_concurrent // 2))
+        self.floor = floor if floor is not None else float(os.getenv("ADAPTIVE_MIN_INTERVAL", "0.1"))
+        self.ceiling = ceiling or float(os.getenv("ADAPTIVE_MAX_INTERVAL", "30"))
+        self.increase_after = increase_after or int(os.getenv("ADAPTIVE_INCREASE_AFTER", "10"))
+        self._cond = threading.Condition(self._lock)
+        self._domains = {}
+        self._workers = {}
+
+    def _state(self, domain):
+        # Caller holds self._lock.
+        if domain not in self._domains:
+            self._domains[domain] = {
+                "interval": self.min_interval,
+                "limit": self.limit,
+                "in_flight": 0,
+                "streak": 0,
+                "samples": 0,
+                "latency": None
+            }
+        return self._domains[domain]
+
+    def wait(self, domain):
+        with self._lock:
+            interval = self._state(domain)["interval"]
+            now = time.time()
+            start = max(now, self._next_start.get(domain, 0))
+            self._next_start[domain] = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def slot(self, url):
+        domain = urlparse(url).netloc
+        with self._cond:
+            state = self._state(domain)
+            while state["in_flight"] >= state["limit"]:
+                self._cond.wait()
+            state["in_flight"] += 1
+        try:
+            self.wait(domain)
+            yield
+        finally:
+            with self._cond:
+                state["in_flight"] -= 1
+                self._cond.notify_all()
+
+    def record(self, url, outcome, latency=None, worker=None):
+        """Feed back how a request went: "ok", "timeout", "consent", "captcha" or "error".
+
+        `worker` labels the per-worker outcome counts in stats(), e.g. the extraction
+        worker's index; requests made outside extraction are counted under "search".
+        """
+        domain = urlparse(url).netloc
+        worker = "search" if worker is None else worker
+        with self._cond:
+            state = self._state(domain)
+            if outcome == "ok" and latency is not None:
+                if state["samples"] >= self.WARMUP_SAMPLES and latency > self.SLOW_FACTOR * state["latency"]:
+                    outcome = "slow"
+                state["latency"] = latency if state["latency"] is None else 0.8 * state["latency"] + 0.2 * latency
+                state["samples"] += 1
+            counts = self._workers.setdefault(worker, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if outcome == "ok":
+                state["interval"] = max(min(self.floor, self.min_interval), state["interval"] * 0.9)
+                state["streak"] += 1
+                if state["streak"] >= self.increase_after and state["limit"] < self.max_concurrent:
+                    state["limit"] += 1
+                    state["streak"] = 0
+                    self._cond.notify_all()
+                return
+            state["streak"] = 0
+            base = max(state["interval"], self.floor, self.MIN_BACKOFF)
+            state["interval"] = min(self.ceiling, base * self.PENALTIES.get(outcome, 2.0))
+            if outcome in ("consent", "captcha"):
+                state["limit"] = 1
+                self._next_start[domain] = max(self._next_start.get(domain, 0), time.time() + state["interval"])
+            elif outcome != "slow":
+                state["limit"] = max(1, state["limit"] // 2)
+            interval, limit = state["interval"], state["limit"]
+        logging.warning(f"Backing off {domain} after {outcome} ({worker}): "
+                        f"{interval:.2f}s between requests, {limit} at a time.")
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry number `attempt`: the widest current gap, doubled per attempt, with jitter."""
+        with self._lock:
+            interval = max([s["interval"] for s in self._domains.values()] or [self.min_interval])
+        return min(self.ceiling, interval * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def stats(self):
+        """Current gap, concurrency limit and latency per domain, and outcome counts per worker."""
+        with self._lock:
+            return {
+                "domains": {
+                    domain: {
+                        "interval": round(s["interval"], 3),
+                        "limit": s["limit"],
+                        "latency": round(s["latency"], 3) if s["latency"] is not None else None
+                    }
+                    for domain, s in self._domains.items()
+                },
+                "workers": {str(worker): dict(counts) for worker, counts in self._workers.items()}
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_throttle():
+    """The process-wide AdaptiveThrottle. Blocks apply to this host, so every job learns from them."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AdaptiveThrottle()
+        return _shared
+
+
+def wait_adaptive(retry_state):
+    """tenacity wait strategy that backs off according to the shared throttle."""
+    return shared_throttle().backoff(retry_state.attempt_number)
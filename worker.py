@@ -1,30 +1,214 @@
 import os
+import sys
+import atexit
+import logging
 import redis
-from rq import Worker, Queue, Connection
-from scrape_maps_phones import main
+from datetime import datetime
+from rq import SimpleWorker, Queue, Connection, get_current_job
+from rq.timeouts import JobTimeoutException
+from scrape_maps_phones import main, scrape_google_maps, setup_driver, CsvSink
+from driver_pool import DriverPool
+from driver_resolver import verify_chromedriver
+from place_cache import PlaceCache
+from dedup import DedupIndex, BusinessSet
+from checkpoint import Checkpoint
+from storage import job_dir, sweep_outputs
+from progress import JobProgress
+from results import store_result
+from spans import SpanRecorder
+from metrics import QUEUE_NAMES, incr, observe
 
-listen = ['high', 'default', 'low']
+listen = list(QUEUE_NAMES)
 
 redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
 
 conn = redis.from_url(redis_url)
 
+# Warm Chrome sessions shared by every job this worker process runs.
+driver_pool = DriverPool()
+atexit.register(driver_pool.close)
+
+place_cache = PlaceCache(conn)
+# Cross-query index of known businesses, consulted before the TTL cache on every page.
+business_index = DedupIndex(conn, fallback=place_cache)
+
+def _record_job_metrics(job, kind, status, spans, businesses=None):
+    """Update the counters and histograms behind the API's /metrics for a job attempt that just ended.
+
+    `status` is finished, failed, or retried for a failed attempt RQ will run again.
+    """
+    if not job:
+        return
+    incr(conn, 'mapphone_jobs_total', {'kind': kind, 'status': status})
+    if job.enqueued_at and job.started_at:
+        observe(conn, 'mapphone_job_wait_seconds', (job.started_at - job.enqueued_at).total_seconds(), {'kind': kind})
+    if job.started_at:
+        observe(conn, 'mapphone_job_duration_seconds', (datetime.utcnow() - job.started_at).total_seconds(),
+                {'kind': kind, 'status': status})
+    for outcome, count in spans.summary().get('detail_page', {}).get('outcomes', {}).items():
+        incr(conn, 'mapphone_detail_pages_total', {'outcome': outcome}, count)
+    if businesses is not None:
+        incr(conn, 'mapphone_businesses_total', amount=len(businesses))
+
+def _will_retry(job):
+    """Whether RQ will run the job again after the current attempt fails (Retry attempts left)."""
+    return bool(job and job.retries_left)
+
+def _finish_job(job, progress, businesses, spans):
+    """Cache the serialized result, tell listeners the job is done and sweep old exports."""
+    if job:
+        spans.save(conn, job.id)
+        try:
+            with spans.span("store_result"):
+                store_result(conn, job.id, businesses, spans.summary())
+        except Exception as e:
+            # scrape_status builds it on first request instead
+            logging.warning(f"Could not cache result for job {job.id}: {str(e)}")
+    if progress:
+        progress.finish()
+    sweep_outputs()
+
 def run_scrape_task(search_term):
     """
     Worker function to perform the scraping task.
     """
+    job = get_current_job()
+    spans = SpanRecorder()
+    progress = JobProgress(job, conn, spans=spans) if job else None
     try:
         if not search_term or not search_term.strip():
             raise ValueError("Search term cannot be empty")
-        businesses = main(search_term)
+        if progress:
+            progress.reset_rows()
+        output_dir = job_dir(job.id, create=True) if job else ""
+        # Picks up where an earlier, unfinished scrape of the same term stopped.
+        checkpoint = Checkpoint(conn, search_term)
+        with spans.span("driver_acquire"):
+            driver = driver_pool.acquire()
+        try:
+            businesses = main(search_term, driver=driver, pool=driver_pool, cache=business_index, output_dir=output_dir,
+                              progress=progress, checkpoint=checkpoint, spans=spans)
+        except BaseException:
+            driver_pool.release(driver, discard=True)
+            raise
+        driver_pool.release(driver)
+        if progress and not checkpoint.complete:
+            progress.update_meta('partial', True)
+        _finish_job(job, progress, businesses, spans)
+        _record_job_metrics(job, 'scrape', 'finished', spans, businesses)
         return businesses
     except Exception as e:
         # Log the error for debugging
-        import logging
         logging.error(f"Scraping failed for '{search_term}': {str(e)}")
+        if progress:
+            progress.update_meta('performance', spans.summary())
+            # A retried attempt resumes from the checkpoint, so listeners only hear about the last failure.
+            if not _will_retry(job):
+                progress.fail(str(e))
+        if job:
+            spans.save(conn, job.id)
+        _record_job_metrics(job, 'scrape', 'retried' if _will_retry(job) else 'failed', spans)
+        raise
+
+def _acquire_batch_driver(spans):
+    """A warm driver from the pool, or a private one when the pool has none to spare. Returns (driver, pooled)."""
+    with spans.span("driver_acquire") as span:
+        driver = driver_pool.acquire()
+        if driver:
+            return driver, True
+        span["outcome"] = "private"
+        logging.warning("No pooled browser available; starting one for the whole batch.")
+        return setup_driver(), False
+
+def _release_batch_driver(driver, pooled, discard=False):
+    if pooled:
+        driver_pool.release(driver, discard=discard)
+    elif driver:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+def _term_status(checkpoint, found):
+    """A batch term's outcome: complete, partial (some pages missing) or failed (nothing found)."""
+    if checkpoint.complete:
+        return {'status': 'complete'}
+    if found:
+        return {'status': 'partial'}
+    return {'status': 'failed', 'error': 'No results: the search was blocked or timed out'}
+
+def run_batch_task(search_terms):
+    """
+    Worker function that scrapes many search terms on one warm browser.
+
+    Businesses are deduplicated across terms (and, through the dedup index, across
+    earlier jobs) into one pair of CSVs, and each term's status is kept in job.meta['terms']:
+    complete, partial (resumable from its checkpoint) or failed. When the pool has no browser
+    to spare, one private browser is started and shared by every term.
+    """
+    job = get_current_job()
+    spans = SpanRecorder()
+    progress = JobProgress(job, conn, spans=spans) if job else None
+    terms = [{'term': term, 'status': 'pending', 'businesses': 0} for term in search_terms]
+    businesses = BusinessSet()
+
+    def publish_terms():
+        if progress:
+            progress.update_meta('terms', [dict(t) for t in terms])
+
+    if progress:
+        progress.reset_rows()
+    publish_terms()
+    driver, pooled = _acquire_batch_driver(spans)
+    try:
+        output_dir = job_dir(job.id, create=True) if job else ""
+        with CsvSink(output_dir) as sink:
+            for entry in terms:
+                if driver and not driver_pool.is_healthy(driver):
+                    _release_batch_driver(driver, pooled, discard=True)
+                    driver = None
+                if not driver:
+                    driver, pooled = _acquire_batch_driver(spans)
+                entry['status'] = 'running'
+                publish_terms()
+                try:
+                    checkpoint = Checkpoint(conn, entry['term'])
+                    found = scrape_google_maps(entry['term'], driver=driver, pool=driver_pool, cache=business_index,
+                                               sink=sink, progress=progress, checkpoint=checkpoint, spans=spans)
+                    entry.update(_term_status(checkpoint, found), businesses=len(found))
+                    for business in found:
+                        businesses.add(business)
+                except JobTimeoutException:
+                    raise
+                except Exception as e:
+                    logging.error(f"Batch term '{entry['term']}' failed: {str(e)}")
+                    entry.update(status='failed', error=str(e))
+                publish_terms()
+    except Exception as e:
+        logging.error(f"Batch scrape failed: {str(e)}")
+        if progress:
+            progress.update_meta('performance', spans.summary())
+            if not _will_retry(job):
+                progress.fail(str(e))
+        if job:
+            spans.save(conn, job.id)
+        _record_job_metrics(job, 'batch', 'retried' if _will_retry(job) else 'failed', spans)
         raise
+    finally:
+        _release_batch_driver(driver, pooled)
+
+    businesses = businesses.values()
+    _finish_job(job, progress, businesses, spans)
+    _record_job_metrics(job, 'batch', 'finished', spans, businesses)
+    return businesses
 
 if __name__ == '__main__':
+    if not verify_chromedriver():
+        # Without a working chromedriver every job would "finish" with an empty result.
+        logging.critical("chromedriver check failed; not starting the worker.")
+        sys.exit(1)
+    sweep_outputs()
     with Connection(conn):
-        worker = Worker(map(Queue, listen))
-        worker.work() 
\ No newline at end of file
+        # SimpleWorker runs jobs in this process, so the driver pool survives between jobs.
+        worker = SimpleWorker(map(Queue, listen))
+        worker.work()